@@ -0,0 +1,30 @@
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BackgroundWriter:
+    """Runs writes on one background thread, in submission order.
+
+    ``submit`` returns as soon as the write is queued and first re-raises the error of any
+    write that already failed, so failures surface on the caller's thread. ``wait`` blocks
+    until every queued write is done, ``close`` also stops the thread.
+    """
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._pending = []
+
+    def submit(self, fn, *args):
+        for future in self._pending:
+            if future.done():
+                future.result()
+        self._pending = [future for future in self._pending if not future.done()]
+        self._pending.append(self._executor.submit(fn, *args))
+
+    def wait(self):
+        for future in self._pending:
+            future.result()
+        self._pending = []
+
+    def close(self):
+        self.wait()
+        self._executor.shutdown()
@@ -0,0 +1,13 @@
+"""
+Benchmarks for the stages of a batch reweighting training step
+==============================================================
+
+Times the project's own code (ResNet-32, per sample gradients, Gram, weights, weighted
+backward, loaders and evaluation) on synthetic CIFAR shaped data, sweeping batch size,
+number of classes and thread count. Runs on cpu only machines.
+
+Example usage:
+    $ python -m benchmarks --batch_sizes 64 128 --num_classes 10 100 --threads 1 4 --output new.json
+    $ python -m benchmarks.compare old.json new.json
+    $ python -m benchmarks.startup --output startup.json
+"""
@@ -0,0 +1,81 @@
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import subprocess
+import time
+
+import torch
+from torch.utils.benchmark import Timer
+
+from benchmarks.stages import STAGES
+
+
+def get_arguments():
+
+    parser = argparse.ArgumentParser(description='Benchmarks for the stages of batch reweighting training')
+    parser.add_argument('--stages', default=['*'], nargs='+', type=str,
+                        help='stage names or glob patterns, e.g. forward "gram/*" (available: {})'.format(
+                            ', '.join(STAGES)))
+    parser.add_argument('--batch_sizes', default=[128], nargs='+', type=int, help='batch sizes to sweep')
+    parser.add_argument('--num_classes', default=[10, 100], nargs='+', type=int, help='numbers of classes to sweep')
+    parser.add_argument('--threads', default=[1], nargs='+', type=int, help='intra-op thread counts to sweep')
+    parser.add_argument('--device', default='cpu', type=str, help='device to run on')
+    parser.add_argument('--num_workers', default=0, type=int, help='workers of the DataLoader stages')
+    parser.add_argument('--min_run_time', default=0.5, type=float, help='seconds of measurement per configuration')
+    parser.add_argument('--output', default=None, type=str, help='json file to write the results to')
+    return parser
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _selected_stages(patterns):
+    return [name for name in STAGES if any(fnmatch.fnmatch(name, pattern) for pattern in patterns)]
+
+
+def run(args):
+    device = torch.device(args.device)
+    results = []
+    for name in _selected_stages(args.stages):
+        for num_classes in args.num_classes:
+            for batch_size in args.batch_sizes:
+                stmt = STAGES[name](batch_size, num_classes, device, args.num_workers)
+                for threads in args.threads:
+                    timer = Timer(stmt="stmt()", globals={"stmt": stmt}, num_threads=threads, label=name,
+                                  sub_label=f"batch_size={batch_size} num_classes={num_classes}",
+                                  description=f"threads={threads}")
+                    measurement = timer.blocked_autorange(min_run_time=args.min_run_time)
+                    if device.type == 'cuda':
+                        torch.cuda.synchronize()
+                    result = {"stage": name, "batch_size": batch_size, "num_classes": num_classes,
+                              "threads": threads, "median_ms": measurement.median * 1e3,
+                              "iqr_ms": measurement.iqr * 1e3, "runs": len(measurement.times)}
+                    results.append(result)
+                    print(f"{name:36s} batch_size={batch_size:<5d} num_classes={num_classes:<5d} "
+                          f"threads={threads:<3d} {result['median_ms']:10.3f} ms (iqr {result['iqr_ms']:.3f})")
+    return results
+
+
+def main():
+    args = get_arguments().parse_args()
+    results = run(args)
+    report = {
+        "meta": {"commit": _git_commit(), "torch": torch.__version__, "device": args.device,
+                 "cpu_count": os.cpu_count(), "platform": platform.platform(),
+                 "time": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+Compares two result files of ``python -m benchmarks``.
+Example usage:
+    $ python -m benchmarks.compare old.json new.json --threshold 1.1
+Exits with status 1 when any stage got slower than ``threshold`` times its old median.
+"""
+
+import argparse
+import json
+import sys
+
+KEY_FIELDS = ("stage", "batch_size", "num_classes", "threads")
+
+
+def _load(file_path):
+    with open(file_path) as f:
+        report = json.load(f)
+    return report["meta"], {tuple(result[field] for field in KEY_FIELDS): result for result in report["results"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compares two benchmark result files')
+    parser.add_argument('old', type=str, help='baseline results')
+    parser.add_argument('new', type=str, help='results to check')
+    parser.add_argument('--threshold', default=1.1, type=float, help='new/old median ratio counted as a regression')
+    args = parser.parse_args()
+
+    old_meta, old_results = _load(args.old)
+    new_meta, new_results = _load(args.new)
+    print(f"old: {old_meta['commit']}  new: {new_meta['commit']}")
+
+    regressions = 0
+    for key in sorted(old_results.keys() & new_results.keys()):
+        old_ms = old_results[key]["median_ms"]
+        new_ms = new_results[key]["median_ms"]
+        ratio = new_ms / old_ms
+        flag = ""
+        if ratio > args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        stage, batch_size, num_classes, threads = key
+        print(f"{stage:36s} batch_size={batch_size:<5d} num_classes={num_classes:<5d} threads={threads:<3d} "
+              f"{old_ms:10.3f} -> {new_ms:10.3f} ms ({ratio:.2f}x){flag}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Accuracy of the gradient sketches: (row >= gamma) count error of the sketched Gram against
+the exact Gram, per method, sketch dimension k and gradient dimension d.
+
+The gradients are clustered around a few directions so similarities spread around gamma.
+Timings of the sketches are measured by the ``sketch/*`` stages of ``python -m benchmarks``.
+
+Example usage:
+    $ python -m benchmarks.sketch_error --dims 650 6500 60000 --ks 32 128 512 --output sketch_error.json
+"""
+
+import argparse
+import json
+import math
+
+import torch
+
+from similarity import dense_gram, threshold_counts
+from sketch import SKETCH_METHODS, GradientSketch
+
+
+def get_arguments():
+
+    parser = argparse.ArgumentParser(description='Count error of sketched against exact similarity counts')
+    parser.add_argument('--dims', default=[650, 6500, 60000], nargs='+', type=int, help='gradient dimensions d')
+    parser.add_argument('--ks', default=[32, 128, 512], nargs='+', type=int, help='sketch dimensions k')
+    parser.add_argument('--batch_size', default=128, type=int, help='rows of the Gram')
+    parser.add_argument('--gamma', default=0.7, type=float, help='similarity threshold')
+    parser.add_argument('--output', default=None, type=str, help='json file to write the results to')
+    return parser
+
+
+def clustered_gradients(batch_size, dim, num_clusters=10, noise=0.8):
+    """Gradients around a few directions, so similarities spread around gamma"""
+
+    centers = torch.randn(num_clusters, dim)
+    assignment = torch.randint(num_clusters, (batch_size,))
+    return centers[assignment] + noise * torch.randn(batch_size, dim) * centers.norm(dim=1).mean() / math.sqrt(dim)
+
+
+def run(args):
+    torch.manual_seed(0)
+    results = []
+    for dim in args.dims:
+        grads = clustered_gradients(args.batch_size, dim)
+        exact = threshold_counts(dense_gram(grads), args.gamma)
+        for method in SKETCH_METHODS[1:]:
+            for k in args.ks:
+                if k >= dim:
+                    continue
+                approx = threshold_counts(dense_gram(GradientSketch(method, k)(grads)), args.gamma)
+                error = (approx - exact).abs().float()
+                result = {"dim": dim, "method": method, "k": k, "mean_error": error.mean().item(),
+                          "max_error": error.max().item(), "exact_rows": (error == 0).float().mean().item() * 100,
+                          "relative_error": (error / exact.float()).mean().item() * 100}
+                results.append(result)
+                print(f"d={dim:<6d} {method:8s} k={k:<4d} mean |count error|={result['mean_error']:.2f} "
+                      f"max={result['max_error']:.0f} rows exact={result['exact_rows']:.1f}% "
+                      f"relative={result['relative_error']:.1f}%")
+    return results
+
+
+def main():
+    args = get_arguments().parse_args()
+    results = run(args)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"gamma": args.gamma, "batch_size": args.batch_size, "results": results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,277 @@
+import os
+import tempfile
+
+import numpy as np
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader
+
+import checkpoint
+import evaluation
+import gradients
+import regularization
+import similarity
+import sketch
+import weighting
+from config import get_arguments
+from dataset import CIFAR10LTNPZDataset
+from dataset.loader import DeviceLoader
+from dataset.transforms import TRAIN_TRANSFORMS, TEST_TRANSFORMS, BATCH_TRANSFORMS
+from model import resnet32
+from scores import ScoreStore
+
+# number of synthetic images behind the loader and evaluation stages
+DATASET_SIZE = 2048
+
+STAGES = {}
+_datasets = {}
+# scratch directories of the checkpoint stage, removed at exit
+_scratch = []
+
+
+def register(name):
+    """Registers a stage setup, setup(batch_size, num_classes, device, num_workers) returns the callable to time"""
+
+    def decorator(setup):
+        STAGES[name] = setup
+        return setup
+    return decorator
+
+
+def _arguments(batch_size, num_classes, device):
+    args = get_arguments().parse_args([])
+    args.batch_size = batch_size
+    args.device = device
+    args.class_names = list(map(str, range(num_classes)))
+    return args
+
+
+def _model(num_classes, device):
+    torch.manual_seed(0)
+    return resnet32(num_classes=num_classes).to(device).train()
+
+
+def _batch(batch_size, num_classes, device):
+    generator = torch.Generator()
+    generator.manual_seed(0)
+    inputs = torch.rand(batch_size, 3, 32, 32, generator=generator) - 1
+    targets = torch.randint(num_classes, (batch_size,), generator=generator)
+    return inputs.to(device), targets.to(device)
+
+
+def _head_outputs(model, inputs, targets):
+    with torch.no_grad():
+        features, logits = model(inputs, layer=2)
+    return features, logits, gradients.head_error(logits, targets)
+
+
+def _synthetic_root(num_classes):
+    """Directory with cifar10-lt shaped npz files holding DATASET_SIZE random images"""
+
+    if num_classes not in _datasets:
+        root = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(0)
+        for split in ("cifar10-lt_train", "cifar10_test"):
+            pixels = rng.integers(0, 256, (DATASET_SIZE, 1, 32, 32, 3))
+            # every class present, so per class accuracies are defined
+            labels = rng.permutation(np.arange(DATASET_SIZE) % num_classes).reshape(-1, 1)
+            np.savez(os.path.join(root.name, split + ".npz"), (pixels / 255 - 0.5).astype(np.float32), labels)
+        _datasets[num_classes] = root
+    return _datasets[num_classes].name
+
+
+def _drain(loader, device):
+    for inputs, target, idx in loader:
+        inputs.to(device)
+
+
+@register("forward")
+def forward(batch_size, num_classes, device, num_workers):
+    model = _model(num_classes, device)
+    inputs, _ = _batch(batch_size, num_classes, device)
+    return lambda: model(inputs, layer=2)
+
+
+def _register_per_sample_gradients(engine, head):
+    @register(f"per_sample_grads/{engine}/{head}")
+    def per_sample_grads(batch_size, num_classes, device, num_workers):
+        model = _model(num_classes, device)
+        inputs, targets = _batch(batch_size, num_classes, device)
+        criterion = nn.CrossEntropyLoss(reduction='none')
+        features, logits, _ = _head_outputs(model, inputs, targets)
+        # the closed form engine reuses the features and logits of the training forward
+        return lambda: gradients.compute_per_sample_gradients(model, inputs, targets, criterion, engine, head,
+                                                              features, logits)
+
+
+def _register_gram(backend, head):
+    @register(f"gram/{backend}/{head}")
+    def gram(batch_size, num_classes, device, num_workers):
+        model = _model(num_classes, device)
+        inputs, targets = _batch(batch_size, num_classes, device)
+        features, logits, error = _head_outputs(model, inputs, targets)
+        if backend == "kron":
+            return lambda: similarity.kron_gram(features, error, head)
+        grads = gradients.closed_form_per_sample_gradients(features, logits, targets, head)
+        return lambda: similarity.dense_gram(grads)
+
+
+@register("per_sample_grads/functorch/layer3+linear")
+def functorch_layer3(batch_size, num_classes, device, num_workers):
+    model = _model(num_classes, device)
+    inputs, targets = _batch(batch_size, num_classes, device)
+    criterion = nn.CrossEntropyLoss(reduction='none')
+    return lambda: gradients.functorch_per_sample_gradients(model, inputs, targets, criterion, ["layer3", "linear"])
+
+
+for _engine in gradients.GRAD_ENGINES:
+    for _head in gradients.GRAD_HEADS:
+        _register_per_sample_gradients(_engine, _head)
+for _backend in similarity.GRAM_BACKENDS:
+    for _head in gradients.GRAD_HEADS:
+        _register_gram(_backend, _head)
+
+
+@register("weights")
+def weights(batch_size, num_classes, device, num_workers):
+    args = _arguments(batch_size, num_classes, device)
+    model = _model(num_classes, device)
+    inputs, targets = _batch(batch_size, num_classes, device)
+    features, logits, error = _head_outputs(model, inputs, targets)
+    gram = similarity.kron_gram(features, error)
+    store = ScoreStore(DATASET_SIZE + batch_size, device)
+    idx = torch.arange(batch_size).view(-1, 1)
+    return lambda: weighting.batch_weights(similarity.threshold_counts(gram, args.gamma), idx, 1, args, store,
+                                           features)
+
+
+@register("weights/loop")
+def loop_weights(batch_size, num_classes, device, num_workers):
+    args = _arguments(batch_size, num_classes, device)
+    model = _model(num_classes, device)
+    inputs, targets = _batch(batch_size, num_classes, device)
+    features, logits, error = _head_outputs(model, inputs, targets)
+    gram = similarity.kron_gram(features, error)
+    score = {}
+    idx = torch.arange(batch_size).view(-1, 1)
+    # the per row / per index implementation the weights stage replaced, for the before/after overhead
+    return lambda: weighting.loop_batch_weights(gram, idx, 1, args, score)
+
+
+def _register_sketch(method):
+    @register(f"sketch/{method}")
+    def sketch_gradients(batch_size, num_classes, device, num_workers):
+        model = _model(num_classes, device)
+        inputs, targets = _batch(batch_size, num_classes, device)
+        features, logits, _ = _head_outputs(model, inputs, targets)
+        grads = gradients.closed_form_per_sample_gradients(features, logits, targets, "linear")
+        sketcher = sketch.GradientSketch(method, 128)
+        # sketch and Gram together, what replaces the dense Gram of the full gradients
+        return lambda: similarity.dense_gram(sketcher(grads))
+
+
+for _method in sketch.SKETCH_METHODS[1:]:
+    _register_sketch(_method)
+
+
+@register("counts/tiled")
+def tiled_counts(batch_size, num_classes, device, num_workers):
+    model = _model(num_classes, device)
+    inputs, targets = _batch(batch_size, num_classes, device)
+    features, _, error = _head_outputs(model, inputs, targets)
+    rows = similarity.kron_gram_rows(features, error, "linear")
+    return lambda: similarity.tiled_threshold_counts(rows, batch_size, 0.7, 0.0, 16,
+                                                     buffers=similarity.row_buffers("kron", "linear"))
+
+
+@register("weighted_backward")
+def weighted_backward(batch_size, num_classes, device, num_workers):
+    model = _model(num_classes, device)
+    inputs, targets = _batch(batch_size, num_classes, device)
+    criterion = nn.CrossEntropyLoss(reduction='none')
+    batch_weights = torch.full((batch_size,), 1.0 / batch_size, device=device)
+
+    def run():
+        loss = criterion(model(inputs), targets)
+        torch.inner(loss, batch_weights).backward()
+        model.zero_grad(set_to_none=True)
+    return run
+
+
+def _register_optimizer(mode):
+    @register(f"optimizer/{mode}")
+    def optimizer_step(batch_size, num_classes, device, num_workers):
+        args = _arguments(batch_size, num_classes, device)
+        args.reg_mode = mode
+        model = _model(num_classes, device)
+        optimizer = regularization.build_optimizer(model.parameters(), args)
+        inputs, targets = _batch(batch_size, num_classes, device)
+        nn.CrossEntropyLoss()(model(inputs), targets).backward()
+
+        def run():
+            if mode == "decoupled":
+                regularization.decoupled_decay_(optimizer, args.weight_decay)
+            optimizer.step()
+            if mode == "double":
+                regularization.l2_penalty(model.parameters())
+        return run
+
+
+for _mode in regularization.REG_MODES:
+    _register_optimizer(_mode)
+
+
+@register("checkpoint/save")
+def checkpoint_save(batch_size, num_classes, device, num_workers):
+    model = _model(num_classes, device)
+    optimizer = torch.optim.SGD(model.parameters(), 0.1, momentum=0.9)
+    directory = tempfile.TemporaryDirectory()
+    _scratch.append(directory)
+    writer = checkpoint.CheckpointWriter(directory.name, keep=1)
+
+    def run():
+        # host copy and the background write to disk
+        writer.save({"state_dict": model.state_dict(), "optimizer": optimizer.state_dict(),
+                     "rng": checkpoint.rng_state()}, 0)
+        writer.wait()
+    return run
+
+
+@register("loader/torch")
+def torch_loader(batch_size, num_classes, device, num_workers):
+    dataset = CIFAR10LTNPZDataset(_synthetic_root(num_classes), True, TRAIN_TRANSFORMS["cifar10-lt"])
+    loader = DataLoader(dataset, batch_size=batch_size, shuffle=True, num_workers=num_workers)
+    return lambda: _drain(loader, device)
+
+
+@register("loader/device")
+def device_loader(batch_size, num_classes, device, num_workers):
+    dataset = CIFAR10LTNPZDataset(_synthetic_root(num_classes), True)
+    loader = DeviceLoader(dataset, batch_size, shuffle=True, transform=BATCH_TRANSFORMS["cifar10-lt"](0), device=device)
+    return lambda: _drain(loader, device)
+
+
+def _test_loader(batch_size, num_classes, num_workers):
+    dataset = CIFAR10LTNPZDataset(_synthetic_root(num_classes), False, TEST_TRANSFORMS["cifar10-lt"])
+    return DataLoader(dataset, batch_size=batch_size, shuffle=False, num_workers=num_workers)
+
+
+@register("evaluate")
+def evaluate(batch_size, num_classes, device, num_workers):
+    args = _arguments(batch_size, num_classes, device)
+    model = _model(num_classes, device)
+    loader = _test_loader(batch_size, num_classes, num_workers)
+    criterion = nn.CrossEntropyLoss(reduction='none')
+    return lambda: evaluation.evaluate(loader, model, criterion, args)
+
+
+@register("evaluate/sweep")
+def sweep(batch_size, num_classes, device, num_workers):
+    model = _model(num_classes, device)
+    loader = _test_loader(batch_size, num_classes, num_workers)
+    args = _arguments(batch_size, num_classes, device)
+    prior = torch.rand(num_classes, dtype=torch.float64, device=device) + 0.01
+    taus = torch.linspace(0, 2, 201, dtype=torch.float64, device=device)
+    adjustments = torch.log((prior / prior.sum()).unsqueeze(0) ** taus.unsqueeze(1) + 1e-12)
+    # one pass over the test set for all 201 taus of a post hoc sweep
+    return lambda: evaluation.sweep_adjustments(*evaluation.collect_logits(loader, model, args), adjustments)
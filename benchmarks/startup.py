@@ -0,0 +1,139 @@
+"""
+Startup benchmark: how long ``import main`` and the first training step take.
+
+Every run starts a fresh interpreter in a scratch directory with a synthetic one batch
+cifar10-lt training set and runs ``main.run`` with ``--max_steps 1``; the times are measured
+from the moment the interpreter is launched, the first step ends at run's ``on_step``
+callback. Also reports whether importing main pulled in torchvision, tensorboard or
+TensorFlow. Writes the same json as ``python -m benchmarks``, so results can be compared
+with ``benchmarks.compare``.
+
+Example usage:
+    $ python -m benchmarks.startup --repeats 5 --output startup.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("torchvision", "torch.utils.tensorboard", "tensorflow")
+
+_CHILD = r'''
+import json
+import sys
+import time
+
+launched = float(sys.argv[1])
+import main
+imported = time.time()
+heavy = {name: name in sys.modules for name in sys.argv[2].split(",")}
+
+import torch
+from config import get_arguments
+
+first_step = {}
+
+
+def on_step(step):
+    if "time" not in first_step:
+        if torch.cuda.is_available():
+            torch.cuda.synchronize()
+        first_step["time"] = time.time()
+
+
+main.run(get_arguments().parse_args(sys.argv[3:]), on_step)
+print(json.dumps({"import_main": imported - launched, "first_step": first_step["time"] - launched,
+                  "imported": heavy}))
+'''
+
+
+def get_arguments():
+
+    parser = argparse.ArgumentParser(description='Import and time to first step of main.py')
+    parser.add_argument('--repeats', default=5, type=int, help='fresh interpreters per configuration')
+    parser.add_argument('--batch_size', default=128, type=int, help='batch size of the first step')
+    parser.add_argument('--br', default=[0, 1], nargs='+', type=int, help='--br values to measure')
+    parser.add_argument('--output', default=None, type=str, help='json file to write the results to')
+    return parser
+
+
+def _synthetic_data(root, batch_size):
+    rng = np.random.default_rng(0)
+    for split in ("cifar10-lt_train", "cifar10_test"):
+        pixels = rng.integers(0, 256, (batch_size, 1, 32, 32, 3))
+        labels = (np.arange(batch_size) % 10).reshape(-1, 1)
+        np.savez(os.path.join(root, split + ".npz"), (pixels / 255 - 0.5).astype(np.float32), labels)
+
+
+def _launch(workdir, code, argv):
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    launched = time.time()
+    output = subprocess.check_output([sys.executable, "-c", code, str(launched)] + argv, cwd=workdir, env=env)
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def _summary(name, batch_size, times):
+    times = np.array(times) * 1e3
+    return {"stage": name, "batch_size": batch_size, "num_classes": 10, "threads": 1,
+            "median_ms": float(np.median(times)),
+            "iqr_ms": float(np.percentile(times, 75) - np.percentile(times, 25)), "runs": len(times)}
+
+
+def run(args):
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        data_home = os.path.join(workdir, "data")
+        os.makedirs(data_home)
+        _synthetic_data(data_home, args.batch_size)
+
+        baseline = [_launch(workdir, "import sys, time; launched = float(sys.argv[1]); import torch; "
+                                     "print('{\"import_torch\": %f}' % (time.time() - launched))", [])["import_torch"]
+                    for _ in range(args.repeats)]
+        results.append(_summary("startup/import_torch", args.batch_size, baseline))
+
+        for br in args.br:
+            argv = [",".join(HEAVY_MODULES), "--dataset", "cifar10-lt", "--data_home", data_home,
+                    "--batch_size", str(args.batch_size), "--num_workers", "0", "--br", str(br),
+                    "--checkpoint_every", "0", "--max_steps", "1"]
+            runs = [_launch(workdir, _CHILD, argv) for _ in range(args.repeats)]
+            if br == args.br[0]:
+                results.append(_summary("startup/import_main", args.batch_size, [r["import_main"] for r in runs]))
+                imported = [name for name, loaded in runs[0]["imported"].items() if loaded]
+                print("modules imported by `import main`: {}".format(", ".join(imported) or "none of "
+                                                                     + ", ".join(HEAVY_MODULES)))
+            results.append(_summary("startup/first_step/br{}".format(br), args.batch_size,
+                                    [r["first_step"] for r in runs]))
+
+    for result in results:
+        print(f"{result['stage']:36s} {result['median_ms']:10.1f} ms (iqr {result['iqr_ms']:.1f}, "
+              f"{result['runs']} runs)")
+    return results
+
+
+def main():
+    args = get_arguments().parse_args()
+    results = run(args)
+    from benchmarks.__main__ import _git_commit
+    import torch
+
+    report = {
+        "meta": {"commit": _git_commit(), "torch": torch.__version__, "device": "cuda" if torch.cuda.is_available()
+                 else "cpu", "cpu_count": os.cpu_count(), "platform": platform.platform(),
+                 "time": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+import copy
+import glob
+import os
+import random
+
+import numpy as np
+import torch
+
+from background import BackgroundWriter
+
+CHECKPOINT_PATTERN = "checkpoint_{:05d}.th"
+# flags that only change logging, I/O or checkpointing, free to differ on --resume
+RESUME_IGNORED = {"data_home", "num_workers", "log_val", "log_interval", "save_dir", "profile", "profile_trace",
+                  "checkpoint_every", "checkpoint_keep", "resume", "dist_backend", "max_steps"}
+
+
+def _to_cpu(obj):
+    """Host copy of a (nested) state dict.
+
+    Device tensors are copied asynchronously into pinned buffers, so the training thread
+    only queues the copies; the caller records an event the writer thread waits on.
+    """
+
+    if torch.is_tensor(obj):
+        if obj.device.type == 'cuda':
+            buffer = torch.empty(obj.shape, dtype=obj.dtype, pin_memory=True)
+            buffer.copy_(obj.detach(), non_blocking=True)
+            return buffer
+        return obj.detach().clone()
+    if isinstance(obj, dict):
+        return {key: _to_cpu(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(_to_cpu(value) for value in obj)
+    return copy.deepcopy(obj)
+
+
+def rng_state():
+    state = {"torch": torch.get_rng_state(), "numpy": np.random.get_state(), "python": random.getstate()}
+    if torch.cuda.is_available():
+        state["cuda"] = torch.cuda.get_rng_state_all()
+    return state
+
+
+def set_rng_state(state):
+    torch.set_rng_state(state["torch"])
+    np.random.set_state(state["numpy"])
+    random.setstate(state["python"])
+    if "cuda" in state and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state["cuda"])
+
+
+class CheckpointWriter(BackgroundWriter):
+    """Saves training checkpoints to ``directory`` from a background thread.
+
+    ``save`` takes a host copy of the state and returns; serialization, the atomic rename
+    of the finished file and pruning to the newest ``keep`` checkpoints happen on the
+    writer thread, in submission order.
+    """
+
+    def __init__(self, directory, keep=3):
+        super().__init__()
+        self.directory = directory
+        self.keep = keep
+
+    def save(self, state, epoch):
+        state = _to_cpu(state)
+        copied = None
+        if torch.cuda.is_available():
+            copied = torch.cuda.Event()
+            copied.record()
+        self.submit(self._save, os.path.join(self.directory, CHECKPOINT_PATTERN.format(epoch)), state, copied)
+
+    def _save(self, path, state, copied):
+        if copied is not None:
+            copied.synchronize()
+        tmp_path = path + '.tmp'
+        torch.save(state, tmp_path)
+        os.replace(tmp_path, path)
+        if self.keep:
+            for old in checkpoints(self.directory)[:-self.keep]:
+                os.remove(old)
+
+
+def resume_config(args, keys):
+    """Values of the config.py flags ``keys`` in ``args`` a checkpoint can only be resumed under"""
+
+    return {key: getattr(args, key) for key in keys if key not in RESUME_IGNORED}
+
+
+def config_mismatch(saved, config):
+    """Sorted flags whose value differs between a checkpoint's configuration and ``config``"""
+
+    return sorted(key for key in set(saved) | set(config) if saved.get(key) != config.get(key))
+
+
+def checkpoints(directory):
+    """Finished checkpoints in ``directory``, oldest first"""
+
+    return sorted(glob.glob(os.path.join(directory, CHECKPOINT_PATTERN.replace("{:05d}", "[0-9]" * 5))))
+
+
+def load_latest(directory):
+    """State of the newest checkpoint in ``directory`` on the cpu, None if there is none"""
+
+    paths = checkpoints(directory)
+    if not paths:
+        return None
+    return torch.load(paths[-1], map_location='cpu', weights_only=False)
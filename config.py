@@ -1,6 +1,16 @@
 import argparse
 
 
+def _grid(value):
+    """'start,stop,num' to num evenly spaced floats from start to stop"""
+
+    start, stop, num = value.split(',')
+    start, stop, num = float(start), float(stop), int(num)
+    if num == 1:
+        return [start]
+    return [start + (stop - start) * i / (num - 1) for i in range(num)]
+
+
 def get_arguments():
 
     parser = argparse.ArgumentParser(
@@ -9,22 +19,44 @@ def get_arguments():
                         choices=["cifar10", "cifar100", "cifar10-lt", "cifar100-lt","imagenet"])
     parser.add_argument('--data_home', default="data", type=str,
                         help='Directory where data files are stored.')
+    parser.add_argument('--data_format', default="npz", type=str,
+                        help='on disk format of the LT datasets. mmap reads the uint8 npy files written by dataset/npz2mmap.py',
+                        choices=["npz", "mmap"])
+    parser.add_argument('--loader', default="torch", type=str, choices=["torch", "device"],
+                        help='torch for a DataLoader with workers, device to keep the whole dataset as a tensor '
+                             'on the training device and augment batches there')
     parser.add_argument('--num_workers', default=2, type=int, metavar='N',
                         help='number of workers at dataloader')
+    parser.add_argument('--batch_augment', default=0, type=int, choices=[0, 1],
+                        help='1 to run crop/flip/normalize batched on the model device instead of per image in the workers')
+    parser.add_argument('--augment_seed', default=0, type=int, help='seed of the batched augmentation, offset by the rank under torchrun')
     parser.add_argument('--batch_size', default=128, type=int, help='mini-batch size (default: 128)')
     parser.add_argument('--lr', default=0.1, type=float, help='initial learning rate')
     parser.add_argument('--momentum', default=0.9, type=float, help='momentum')
     parser.add_argument('--weight-decay', default=1e-4, type=float, help='weight decay (default: 1e-4)')
+    parser.add_argument('--reg_mode', default='fused', type=str, choices=["fused", "decoupled", "double"],
+                        help='fused: weight decay inside the SGD step, decoupled: parameters shrunk by lr * wd '
+                             'before the step, double: the old explicit l2 loss term plus SGD decay (3x wd in total)')
     parser.add_argument('--log_val', help='compute val acc', type=int, default=10)
+    parser.add_argument('--log_interval', default=0, type=int,
+                        help='also log the running train loss/acc every this many steps (0: once per epoch only)')
+    parser.add_argument('--max_steps', default=0, type=int,
+                        help='stop training after this many optimizer steps in total, e.g. for smoke tests (0: no limit)')
     parser.add_argument('--logit_adj_post', help='adjust logits post hoc', type=int, default=0, choices=[0, 1])
     parser.add_argument('--tro_post_range', help='check diffrent val of tro in post hoc', type=list,
                         default=[0.25, 0.5, 0.75, 1, 1.5, 2])
+    parser.add_argument('--tro_post_grid', default=[], type=_grid,
+                        help='start,stop,num: sweep num evenly spaced post hoc tros instead of --tro_post_range')
     parser.add_argument('--logit_adj_train', help='adjust logits in trainingc', type=int, default=0, choices=[0, 1])
     parser.add_argument('--br', help='enable batch reweighting', type=int, default=0, choices=[0, 1])
     parser.add_argument('--rc', help='representation correction', type=int, default=0, choices=[0, 1])
     parser.add_argument('--gamma', help='threshold for gradient similarity', type=float, default=0.7)
     parser.add_argument('--tro_train', default=1.0, type=float, help='tro for logit adj train')
-    parser.add_argument('--update_gap', default=50, type=int, help='updating weights gap')
+    parser.add_argument('--update_gap', default=1, type=int,
+                        help='updating weights gap: per sample weights are recomputed every update_gap steps/epochs '
+                             'and looked up from the cache in between')
+    parser.add_argument('--update_unit', default='steps', type=str, choices=['steps', 'epochs'],
+                        help='unit of --update_gap')
     parser.add_argument('--measure', default=0, type=int, help='0 for gradient, 1 for embedding and 2 for gradient+embedding',choices=[0,1,2])
     parser.add_argument('--temp', default=1, type=float, help='tempreturen in softmax')
     parser.add_argument('--norm', default=1, type=int, help='0 for not normalize 1 for normalize', choices=[0,1])
@@ -35,6 +67,53 @@ def get_arguments():
     parser.add_argument('--wo', default=0, type=int, help='weighting option. 0 for softmax, 1 for inverse', choices=[0,1])
     parser.add_argument('--eps', default=0.5, type=float, help='small value to avoid divided by 0')
     parser.add_argument('--cumulative', default=0, type=int, help='whether to cumulate the score', choices =[0,1])
+    parser.add_argument('--grad_engine', default='closed_form', type=str,
+                        help='per sample gradient engine. loop for one autograd call per sample, '
+                             'closed_form for the batched softmax-error outer product, functorch for vmap over any layers',
+                        choices=['loop', 'closed_form', 'functorch'])
+    parser.add_argument('--grad_layers', default=[], type=lambda layers: layers.split(','),
+                        help='comma separated modules/parameters the functorch engine differentiates, e.g. layer3,linear '
+                             '(default: the --grad_head parameters)')
+    parser.add_argument('--grad_memory_mb', default=1024, type=float,
+                        help='memory budget of the per sample gradients of one functorch chunk')
+    parser.add_argument('--grad_head', default='bias', type=str,
+                        help='linear head parameters the per sample gradients are taken w.r.t.', choices=['bias', 'linear'])
+    parser.add_argument('--gram_backend', default='dense', type=str,
+                        help='dense for the Gram of materialized per sample gradients, kron for the Gram built '
+                             'from the feature and softmax-error factors of the linear head', choices=['dense', 'kron'])
+    parser.add_argument('--gram_tile_mb', default=0, type=float,
+                        help='stream the Gram in row blocks of about this many MB when counting similar samples '
+                             '(0 for the whole Gram at once)')
+    parser.add_argument('--sketch', default='none', type=str, choices=['none', 'gaussian', 'sparse', 'srht'],
+                        help='random projection applied to per sample gradients before the dense Gram')
+    parser.add_argument('--sketch_dim', default=128, type=int, help='dimension gradients are sketched to')
+    parser.add_argument('--sketch_seed', default=0, type=int, help='seed of the sketching projection')
+    parser.add_argument('--sketch_resample', default=0, type=int, choices=[0, 1],
+                        help='0 to draw the projection once and cache it, 1 to redraw it every step from seed + step')
+    parser.add_argument('--bank_size', default=0, type=int,
+                        help='number of recent per sample gradients each batch is also compared against (0 to disable)')
+    parser.add_argument('--bank_max_age', default=0, type=int,
+                        help='steps after which a bank entry is stale and ignored (0 to keep entries until overwritten)')
+    parser.add_argument('--profile', default=0, type=int, choices=[0, 1],
+                        help='1 to time every stage of the training step and log per epoch totals and peak memory')
+    parser.add_argument('--profile_trace', default=None, type=lambda s: tuple(map(int, s.split(','))),
+                        help='start,stop: with --profile 1 export a torch.profiler Chrome trace of these steps')
+    parser.add_argument('--checkpoint_every', default=10, type=int,
+                        help='epochs between checkpoints of model, optimizer, scheduler, scores and rng state (0 to disable)')
+    parser.add_argument('--checkpoint_keep', default=3, type=int, help='number of newest checkpoints kept (0 keeps all)')
+    parser.add_argument('--resume', default=0, type=int, choices=[0, 1],
+                        help='1 to continue from the newest checkpoint of the run folder, if there is one')
+    parser.add_argument('--dist_backend', default='auto', type=str, choices=['auto', 'gloo', 'nccl'],
+                        help='process group backend when launched with torchrun, auto picks nccl with GPUs and gloo otherwise')
+    parser.add_argument('--keep_ratio', default=1.0, type=float,
+                        help='fraction of the training set drawn per epoch after warm-up, favouring samples with low '
+                             'redundancy scores (1 to train on every sample)')
+    parser.add_argument('--prune_warmup', default=10, type=int, help='epochs on the full training set before pruning')
+    parser.add_argument('--prune_refresh', default=10, type=int, help='epochs between re-selections of the kept subset')
+    parser.add_argument('--prune_head_only', default=1, type=int, choices=[0, 1],
+                        help='1 to always keep samples of classes smaller than the average class')
+    parser.add_argument('--score_history', default=0, type=int,
+                        help='number of past epochs of per sample scores kept in a float16 ring (0 to disable)')
 
     
 
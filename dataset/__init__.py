@@ -1,12 +1,50 @@
 import abc
-from torch.utils.data import TensorDataset
+from torch.utils.data import Dataset, TensorDataset
 import numpy as np
 import os
 import torch
 from torchvision.datasets import CIFAR10, CIFAR100
 
 
-class _CIFARLTNPZDataset(TensorDataset):
+class _LabelIndex:
+    """Label array and class index of a dataset, built once from the stored labels on first use.
+
+    Class counts, priors and the samples of a class are lookups afterwards instead of a pass
+    over a DataLoader. Subclasses implement _load_labels.
+    """
+
+    _label_array = None
+    _class_counts = None
+    _class_order = None
+    _class_offsets = None
+
+    def _load_labels(self):
+        raise NotImplementedError
+
+    def get_labels(self):
+        """int64 numpy array with the label of every sample"""
+
+        if self._label_array is None:
+            self._label_array = np.asarray(self._load_labels(), dtype=np.int64).reshape(-1)
+        return self._label_array
+
+    def get_class_counts(self):
+        """int64 numpy array with the number of samples of each class"""
+
+        if self._class_counts is None:
+            self._class_counts = np.bincount(self.get_labels(), minlength=len(self.get_classes()))
+        return self._class_counts
+
+    def get_class_indices(self, label):
+        """Indices of the samples of one class"""
+
+        if self._class_order is None:
+            self._class_order = np.argsort(self.get_labels(), kind="stable")
+            self._class_offsets = np.concatenate([[0], np.cumsum(self.get_class_counts())])
+        return self._class_order[self._class_offsets[label]:self._class_offsets[label + 1]]
+
+
+class _CIFARLTNPZDataset(_LabelIndex, TensorDataset):
 
     def __init__(self, cifar_prefix: str, root: str, train: bool, transform=None, download=False):
         self._m_transform = transform
@@ -30,6 +68,16 @@ class _CIFARLTNPZDataset(TensorDataset):
         idx = np.expand_dims(idx, axis=1)
         return loaded_file_data["arr_0"], loaded_file_data["arr_1"], idx
 
+    def get_uint8_data(self):
+        """All images as uint8 NCHW pixels and all labels, the inverse of tfr2npz's scaling"""
+
+        images = self.tensors[0].view(-1, 32, 32, 3).permute(0, 3, 1, 2)
+        images = ((images + 0.5) * 255).round().clamp(0, 255).to(dtype=torch.uint8)
+        return images.contiguous(), self.tensors[1].view(-1)
+
+    def _load_labels(self):
+        return self.tensors[1].numpy()
+
     def _process_image(self, image):
         image = image.squeeze()
         image = image.transpose(1, 2).transpose(0, 1)
@@ -63,12 +111,99 @@ class _CIFARLTNPZDataset(TensorDataset):
         pass
 
 
-class CIFAR10Dataset(CIFAR10):
+class _CIFARLTMmapDataset(_LabelIndex, Dataset):
+    """CIFAR LT stored as raw uint8 HWC images and int64 labels in npy files (see npz2mmap.py).
+
+    The files are opened lazily with np.load(mmap_mode='r'), so construction is near instant,
+    every DataLoader worker maps the same pages from the OS cache, and images are scaled to
+    the float range of the npz format (pixel / 255 - 0.5) one sample at a time.
+    """
+
+    def __init__(self, cifar_prefix: str, root: str, train: bool, transform=None, download=False):
+        self._m_transform = transform
+
+        file_prefix: str = os.path.join(root, cifar_prefix + "_" + ("train" if train else "test"))
+        self._images_path = file_prefix + "_images.npy"
+        self._labels_path = file_prefix + "_labels.npy"
+        self._images = None
+        self._labels = None
+        self._length = len(np.load(self._labels_path, mmap_mode='r'))
+
+    def _open(self):
+        # opened on first access so every worker process maps the files itself
+        if self._images is None:
+            self._images = np.load(self._images_path, mmap_mode='r')
+            self._labels = np.load(self._labels_path, mmap_mode='r')
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_images"] = None
+        state["_labels"] = None
+        return state
+
+    def __len__(self):
+        return self._length
+
+    def get_uint8_data(self):
+        """All images as uint8 NCHW pixels and all labels"""
+
+        images = torch.from_numpy(np.load(self._images_path)).permute(0, 3, 1, 2)
+        return images.contiguous(), torch.from_numpy(np.load(self._labels_path))
+
+    def _load_labels(self):
+        return np.load(self._labels_path)
+
+    def _process_image(self, image):
+        image = torch.from_numpy(np.array(image)).permute(2, 0, 1)
+        image = image.to(dtype=torch.float32) / 255 - 0.5
+        if self._m_transform:
+            image = self._m_transform(image)
+
+        return image
+
+    def __getitem__(self, idx):
+        self._open()
+        image = self._process_image(self._images[idx])
+        label = np.int64(self._labels[idx])
+
+        return image, label, torch.tensor([idx], dtype=torch.int64)
+
+    @abc.abstractmethod
+    def get_classes(self):
+        pass
+
+    @abc.abstractmethod
+    def get_identifier(self):
+        pass
+
+    @abc.abstractmethod
+    def get_epoch(self):
+        pass
+
+    @abc.abstractmethod
+    def get_scheduler(self):
+        pass
+
+
+def _torchvision_uint8_data(dataset):
+    """All images of a torchvision CIFAR dataset as uint8 NCHW pixels and all labels"""
+
+    images = torch.from_numpy(dataset.data).permute(0, 3, 1, 2)
+    return images.contiguous(), torch.tensor(dataset.targets, dtype=torch.int64)
+
+
+class CIFAR10Dataset(_LabelIndex, CIFAR10):
     CLASSES = ['plane', 'car', 'bird', 'cat', 'deer', 'dog', 'frog', 'horse', 'ship', 'truck']
 
     def get_classes(self):
         return CIFAR10Dataset.CLASSES
 
+    def get_uint8_data(self):
+        return _torchvision_uint8_data(self)
+
+    def _load_labels(self):
+        return self.targets
+
     def get_identifier(self):
         return "cifar10"
 
@@ -80,12 +215,18 @@ class CIFAR10Dataset(CIFAR10):
         return [150, 230, 280]
 
 
-class CIFAR100Dataset(CIFAR100):
+class CIFAR100Dataset(_LabelIndex, CIFAR100):
     CLASSES = list(map(str, range(100)))
 
     def get_classes(self):
         return CIFAR100Dataset.CLASSES
 
+    def get_uint8_data(self):
+        return _torchvision_uint8_data(self)
+
+    def _load_labels(self):
+        return self.targets
+
     def get_identifier(self):
         return "cifar100"
 
@@ -141,3 +282,26 @@ class CIFAR100LTNPZDataset(_CIFARLTNPZDataset):
 
     def get_scheduler(self):
         return [691, 1059, 1290]
+
+
+class CIFAR10LTMmapDataset(_CIFARLTMmapDataset):
+    def __init__(self, root: str, train: bool, transform=None, download=False):
+        super().__init__(CIFAR10LTNPZDataset.PREFIX_DATASET_TRAIN if train else CIFAR10LTNPZDataset.PREFIX_DATASET_TEST,
+                         root, train, transform, download)
+
+    get_classes = CIFAR10LTNPZDataset.get_classes
+    get_identifier = CIFAR10LTNPZDataset.get_identifier
+    get_epoch = CIFAR10LTNPZDataset.get_epoch
+    get_scheduler = CIFAR10LTNPZDataset.get_scheduler
+
+
+class CIFAR100LTMmapDataset(_CIFARLTMmapDataset):
+    def __init__(self, root: str, train: bool, transform=None, download=False):
+        super().__init__(
+            CIFAR100LTNPZDataset.PREFIX_DATASET_TRAIN if train else CIFAR100LTNPZDataset.PREFIX_DATASET_TEST, root,
+            train, transform, download)
+
+    get_classes = CIFAR100LTNPZDataset.get_classes
+    get_identifier = CIFAR100LTNPZDataset.get_identifier
+    get_epoch = CIFAR100LTNPZDataset.get_epoch
+    get_scheduler = CIFAR100LTNPZDataset.get_scheduler
@@ -1,7 +1,14 @@
-import tensorflow as tf
+def _tensor_feature_description():
+    # TensorFlow is only needed by the tfrecord conversion, import it on first use
+    import tensorflow as tf
 
+    return {
+        "image/encoded": tf.io.FixedLenFeature((), tf.string),
+        "image/class/label": tf.io.FixedLenFeature([], tf.int64, -1)
+    }
 
-CIFAR_LT_DATASET_TENSOR_FEATURE_DESCRIPTION = {
-    "image/encoded": tf.io.FixedLenFeature((), tf.string),
-    "image/class/label": tf.io.FixedLenFeature([], tf.int64, -1)
-}
+
+def __getattr__(name):
+    if name == "CIFAR_LT_DATASET_TENSOR_FEATURE_DESCRIPTION":
+        return _tensor_feature_description()
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
@@ -0,0 +1,48 @@
+import math
+
+import torch
+
+
+class DeviceLoader:
+    """Iterates over a whole dataset held as uint8 tensors on the training device.
+
+    Batches are cut from a shuffled index permutation with index_select and transformed as
+    a whole, so there is no per sample collation and no worker IPC. Yields the same
+    ``(inputs, target, idx)`` triples as a DataLoader over the datasets in this package,
+    with ``idx`` as a (B, 1) int64 cpu tensor.
+    """
+
+    def __init__(self, dataset, batch_size, shuffle=False, transform=None, device='cpu', seed=0, sampler=None):
+        self.dataset = dataset
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.sampler = sampler
+        self.transform = transform
+        self.device = device
+
+        images, labels = dataset.get_uint8_data()
+        self.images = images.to(device)
+        self.labels = labels.to(device=device, dtype=torch.int64)
+        self._generator = torch.Generator()
+        self._generator.manual_seed(seed)
+
+    def __len__(self):
+        num_samples = len(self.sampler) if self.sampler is not None else self.labels.size(0)
+        return math.ceil(num_samples / self.batch_size)
+
+    def __iter__(self):
+        if self.sampler is not None:
+            order = torch.tensor(list(self.sampler), dtype=torch.int64)
+        elif self.shuffle:
+            order = torch.randperm(self.labels.size(0), generator=self._generator)
+        else:
+            order = torch.arange(self.labels.size(0))
+        num_samples = order.size(0)
+
+        for start in range(0, num_samples, self.batch_size):
+            idx = order[start:start + self.batch_size]
+            device_idx = idx.to(self.device, non_blocking=True)
+            inputs = self.images.index_select(0, device_idx)
+            if self.transform is not None:
+                inputs = self.transform(inputs)
+            yield inputs, self.labels.index_select(0, device_idx), idx.view(-1, 1)
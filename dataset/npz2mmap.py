@@ -0,0 +1,51 @@
+"""
+Code for converting CIFAR Long Tail Datasets from npz format to memory mappable npy files.
+Example usage:
+    $ python -m npz2mmap --src=/path/to/name.npz --dest=/path/to/dest/folder
+Images are stored as raw uint8 HWC pixels in name_images.npy and labels as int64 in name_labels.npy,
+both can be opened lazily with np.load(path, mmap_mode='r').
+Note that dest folder should exist prior to invoking the command.
+"""
+
+from absl import app
+from absl import flags
+import numpy as np
+import os
+from pathlib import Path
+
+FLAGS = flags.FLAGS
+
+flags.DEFINE_string("src", None, "The path to the npz file that is needed to be converted.")
+flags.DEFINE_string("dest", "data", "The directory in which the converted files are to be stored.")
+
+IMAGES_SUFFIX = "_images.npy"
+LABELS_SUFFIX = "_labels.npy"
+
+
+def _load_npz(file_path: str):
+    loaded_file_data = np.load(file_path, allow_pickle=True)
+    return loaded_file_data["arr_0"], loaded_file_data["arr_1"]
+
+
+def _to_uint8_images(data):
+    # npz images hold pixel / 255 - 0.5, see tfr2npz._parse_image
+    data = data.reshape(len(data), 32, 32, 3)
+    return np.clip(np.rint((data + 0.5) * 255), 0, 255).astype(np.uint8)
+
+
+def _save_mmap_to_dest(dest: str, dataset_name: str, images, labels):
+    np.save(os.path.join(dest, dataset_name + IMAGES_SUFFIX), np.ascontiguousarray(images))
+    np.save(os.path.join(dest, dataset_name + LABELS_SUFFIX), labels.reshape(-1).astype(np.int64))
+
+
+def main(_):
+    src: str = FLAGS.src
+    dest: str = FLAGS.dest
+
+    np_data, np_labels = _load_npz(src)
+    dataset_name: str = Path(src).stem
+    _save_mmap_to_dest(dest, dataset_name, _to_uint8_images(np_data), np_labels)
+
+
+if __name__ == "__main__":
+    app.run(main)
@@ -0,0 +1,118 @@
+import numpy as np
+import torch
+from torch.utils.data import Sampler
+
+# keeps 1 / count finite for samples whose count is (still) zero
+COUNT_EPS = 1e-6
+
+
+class SumTree:
+    """Array backed binary tree of partial sums over non-negative weights.
+
+    Drawing an index with probability proportional to its weight and changing one weight
+    are both O(log n).
+    """
+
+    def __init__(self, weights):
+        self.size = len(weights)
+        self.capacity = 1 << max(self.size - 1, 0).bit_length()
+        self.tree = np.zeros(2 * self.capacity)
+        self.tree[self.capacity:self.capacity + self.size] = weights
+        start = self.capacity // 2
+        while start >= 1:
+            self.tree[start:2 * start] = self.tree[2 * start:4 * start:2] + self.tree[2 * start + 1:4 * start:2]
+            start //= 2
+
+    def total(self):
+        return self.tree[1]
+
+    def update(self, index, weight):
+        position = index + self.capacity
+        delta = weight - self.tree[position]
+        while position >= 1:
+            self.tree[position] += delta
+            position //= 2
+
+    def find(self, value):
+        """Index of the leaf whose prefix sum interval contains value"""
+
+        position = 1
+        while position < self.capacity:
+            left = 2 * position
+            if value < self.tree[left]:
+                position = left
+            else:
+                value -= self.tree[left]
+                position = left + 1
+        return position - self.capacity
+
+    def draw(self, rng):
+        while True:
+            index = self.find(rng.random() * self.total())
+            # rounding can land on an emptied leaf at an interval boundary
+            if index < self.size and self.tree[index + self.capacity] > 0:
+                return index
+
+
+class ScoreSampler(Sampler):
+    """Per epoch subset of the training set that skips redundant samples.
+
+    For the first ``warmup`` epochs every sample is drawn. Afterwards, every ``refresh``
+    epochs, ``keep_ratio`` of the training set is drawn without replacement with probability
+    proportional to 1 / the sample's latest similarity count, so samples whose gradients
+    resemble many others in their batch (mostly head classes) are seen less often. Unlike
+    the cumulative score, which shrinks by 1 / (epoch + 1), the counts keep their scale, so
+    the draw does not flatten to uniform in later epochs; samples without a count yet are
+    drawn first. With ``head_only`` the samples of classes
+    smaller than the average class are always kept and only the remaining budget is drawn from
+    the larger classes. Between refreshes the same subset is reshuffled every epoch.
+    ``labels`` (the dataset's label array) fixes the class sizes up front; without it they
+    come from the labels the score store has recorded so far.
+    """
+
+    def __init__(self, num_train, keep_ratio=1.0, warmup=0, refresh=1, head_only=True, seed=0, labels=None):
+        self.num_train = num_train
+        self.keep_ratio = keep_ratio
+        self.warmup = warmup
+        self.refresh = refresh
+        self.head_only = head_only
+        self._rng = np.random.default_rng(seed)
+        self._generator = torch.Generator()
+        self._generator.manual_seed(seed)
+        self.indices = torch.arange(num_train)
+        self.labels = labels
+
+    def _select(self, counts, labels):
+        budget = int(round(self.keep_ratio * self.num_train))
+        candidates = np.arange(self.num_train)
+        kept = np.zeros(0, dtype=np.int64)
+        if self.head_only:
+            class_sizes = np.bincount(labels[labels >= 0])
+            tail = class_sizes[np.maximum(labels, 0)] < class_sizes[class_sizes > 0].mean()
+            kept = candidates[tail & (labels >= 0)]
+            candidates = candidates[~tail | (labels < 0)]
+
+        weights = 1.0 / np.maximum(counts[candidates], COUNT_EPS)
+        tree = SumTree(weights)
+        drawn = []
+        for _ in range(min(max(budget - len(kept), 0), len(candidates))):
+            leaf = tree.draw(self._rng)
+            tree.update(leaf, 0.0)
+            drawn.append(candidates[leaf])
+        return torch.from_numpy(np.concatenate([kept, np.asarray(drawn, dtype=np.int64)]))
+
+    def set_epoch(self, epoch, score_store):
+        """Re-selects the subset from the similarity counts of a ``scores.ScoreStore`` when a refresh is due"""
+
+        if epoch < self.warmup or self.keep_ratio >= 1:
+            self.indices = torch.arange(self.num_train)
+        elif (epoch - self.warmup) % self.refresh == 0:
+            labels = self.labels if self.labels is not None else score_store.labels.cpu().numpy()
+            self.indices = self._select(score_store.counts.cpu().numpy(), labels)
+
+    def __iter__(self):
+        order = torch.randperm(len(self.indices), generator=self._generator)
+        return iter(self.indices[order].tolist())
+
+    def __len__(self):
+        return len(self.indices)
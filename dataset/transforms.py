@@ -1,3 +1,5 @@
+import torch
+import torch.nn.functional as F
 import torchvision.transforms as transforms
 
 # data lie between (-0.5 , 0.5 )
@@ -43,3 +45,82 @@ TEST_TRANSFORMS = {
     "cifar10-lt": normalize,
     "cifar100-lt": normalize,
 }
+
+
+class BatchAugment:
+    """Random crop with zero padding, horizontal flip and normalize for a whole batch.
+
+    Does the work of ``TRAIN_TRANSFORMS`` in a few vectorized ops on the device of the batch,
+    so it can run next to the model instead of per image in the loader workers. Accepts
+    float NCHW batches or uint8 NCHW/NHWC batches, the latter are first mapped to
+    pixel / 255 - pixel_offset. Random draws come from a per device generator seeded with
+    ``seed``, so a run is reproducible.
+    """
+
+    def __init__(self, size=32, padding=4, mean=(0.5, 0.5, 0.5), std=(1.0, 1.0, 1.0), pixel_offset=0.0, seed=0):
+        self.size = size
+        self.padding = padding
+        self.mean = torch.tensor(mean).view(1, -1, 1, 1)
+        self.std = torch.tensor(std).view(1, -1, 1, 1)
+        self.pixel_offset = pixel_offset
+        self.seed = seed
+        self._generators = {}
+
+    def manual_seed(self, seed):
+        self.seed = seed
+        self._generators = {}
+
+    def _generator(self, device):
+        if device not in self._generators:
+            generator = torch.Generator(device=device)
+            generator.manual_seed(self.seed)
+            self._generators[device] = generator
+        return self._generators[device]
+
+    def to_float(self, batch):
+        if batch.dtype != torch.uint8:
+            return batch
+        if batch.size(-1) in (1, 3) and batch.size(1) not in (1, 3):
+            batch = batch.permute(0, 3, 1, 2)
+        return batch.float() / 255 - self.pixel_offset
+
+    def __call__(self, batch):
+        batch = self.to_float(batch)
+        generator = self._generator(batch.device)
+        n, c = batch.size(0), batch.size(1)
+
+        flip = torch.rand(n, generator=generator, device=batch.device) < 0.5
+        batch = torch.where(flip.view(-1, 1, 1, 1), batch.flip(3), batch)
+
+        padded = F.pad(batch, [self.padding] * 4)
+        offsets = torch.randint(2 * self.padding + 1, (2, n), generator=generator, device=batch.device)
+        window = torch.arange(self.size, device=batch.device)
+        rows = (offsets[0].view(-1, 1) + window).view(n, 1, self.size, 1)
+        cols = (offsets[1].view(-1, 1) + window).view(n, 1, 1, self.size)
+        batch = padded[torch.arange(n, device=batch.device).view(-1, 1, 1, 1),
+                       torch.arange(c, device=batch.device).view(1, -1, 1, 1), rows, cols]
+
+        return self.normalize(batch)
+
+    def normalize(self, batch):
+        """Only the deterministic part, matching TEST_TRANSFORMS"""
+
+        batch = self.to_float(batch)
+        return (batch - self.mean.to(batch.device)) / self.std.to(batch.device)
+
+
+# Pre Processing Config for Train Dataset when augmentation runs batched on the model device
+PRE_BATCH_TRANSFORMS = {
+    "cifar10": transforms.PILToTensor(),
+    "cifar100": transforms.PILToTensor(),
+    "cifar10-lt": None,
+    "cifar100-lt": None,
+}
+
+# Batched augmentation matching TRAIN_TRANSFORMS, the cifar10/100 inputs are uint8 pixels
+BATCH_TRANSFORMS = {
+    "cifar10": lambda seed: BatchAugment(pixel_offset=0.0, seed=seed),
+    "cifar100": lambda seed: BatchAugment(pixel_offset=0.0, seed=seed),
+    "cifar10-lt": lambda seed: BatchAugment(pixel_offset=0.5, seed=seed),
+    "cifar100-lt": lambda seed: BatchAugment(pixel_offset=0.5, seed=seed),
+}
@@ -6,3 +6,8 @@ DATASET_MAPPINGS = {
     "cifar10-lt": CIFAR10LTNPZDataset,
     "cifar100-lt": CIFAR100LTNPZDataset,
 }
+
+MMAP_DATASET_MAPPINGS = {
+    "cifar10-lt": CIFAR10LTMmapDataset,
+    "cifar100-lt": CIFAR100LTMmapDataset,
+}
@@ -0,0 +1,130 @@
+import os
+
+import torch
+import torch.distributed as dist
+
+
+def init(args):
+    """Joins the process group when launched by torchrun and sets args.rank / world_size / device.
+
+    Outside torchrun (no WORLD_SIZE in the environment) this is a single process run with
+    rank 0 of 1 and every helper below is a no-op. gloo works on cpu only machines, nccl
+    needs one GPU per process.
+    """
+
+    args.world_size = int(os.environ.get("WORLD_SIZE", 1))
+    args.rank = int(os.environ.get("RANK", 0))
+    args.local_rank = int(os.environ.get("LOCAL_RANK", 0))
+    args.distributed = args.world_size > 1
+    if not args.distributed:
+        return
+
+    backend = args.dist_backend
+    if backend == 'auto':
+        backend = 'nccl' if torch.cuda.is_available() else 'gloo'
+    if torch.cuda.is_available():
+        torch.cuda.set_device(args.local_rank)
+        args.device = torch.device('cuda', args.local_rank)
+    dist.init_process_group(backend=backend)
+
+
+def is_distributed():
+    return dist.is_available() and dist.is_initialized()
+
+
+def is_main(args):
+    """Whether this process logs, writes scores and saves checkpoints"""
+
+    return args.rank == 0
+
+
+def wrap(model, args):
+    """DistributedDataParallel when launched by torchrun, DataParallel otherwise"""
+
+    if not args.distributed:
+        return torch.nn.DataParallel(model)
+    device_ids = [args.local_rank] if args.device.type == 'cuda' else None
+    return torch.nn.parallel.DistributedDataParallel(model, device_ids=device_ids)
+
+
+def all_gather(tensor):
+    """Concatenation of a tensor over all ranks in rank order.
+
+    DistributedSampler gives every rank the same number of samples, so batches, and with
+    them the gathered tensors, have the same size on every rank.
+    """
+
+    if not is_distributed():
+        return tensor
+    parts = [torch.empty_like(tensor) for _ in range(dist.get_world_size())]
+    dist.all_gather(parts, tensor.contiguous())
+    return torch.cat(parts)
+
+
+def local_rows(tensor, batch_size, args):
+    """The rows of this rank in a tensor gathered by all_gather"""
+
+    start = args.rank * batch_size
+    return tensor[start:start + batch_size]
+
+
+def any_rank(flag, device):
+    """True on every rank if flag is True on any rank"""
+
+    if not is_distributed():
+        return flag
+    flag = torch.tensor(int(flag), device=device)
+    dist.all_reduce(flag, op=dist.ReduceOp.MAX)
+    return bool(flag.item())
+
+
+def mean_over_ranks(value, device):
+    """Average of a python number over ranks"""
+
+    if not is_distributed():
+        return value
+    value = torch.tensor(float(value), dtype=torch.float64, device=device)
+    dist.all_reduce(value)
+    return value.item() / dist.get_world_size()
+
+
+def merge_scores(score_store):
+    """Merges the score shards of all ranks into identical replicas, called at epoch end.
+
+    Every rank updates the store only for the samples of its own batches (the ``touched``
+    mask). Starting from identical replicas, a sample then takes the average of the values
+    of the ranks that touched it this epoch (only more than one rank for the few samples
+    DistributedSampler repeats to even out the shards) and keeps its value otherwise.
+    """
+
+    if not is_distributed():
+        score_store.touched.zero_()
+        return
+
+    device = score_store.scores.device
+    touched = score_store.touched.to(score_store.scores.dtype)
+    owners = touched.clone()
+    dist.all_reduce(owners)
+    for values in (score_store.scores, score_store.counts):
+        summed = values * touched
+        dist.all_reduce(summed)
+        values.copy_(torch.where(owners > 0, summed / owners.clamp_min(1), values))
+
+    for mask in (score_store.seen, score_store.cached):
+        merged = mask.to(device=device, dtype=torch.uint8)
+        dist.all_reduce(merged, op=dist.ReduceOp.MAX)
+        mask.copy_(merged.to(mask.device).bool())
+    dist.all_reduce(score_store.labels, op=dist.ReduceOp.MAX)
+    score_store.touched.zero_()
+
+
+class NullWriter:
+    """Stands in for the SummaryWriter on ranks other than 0"""
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+def cleanup():
+    if is_distributed():
+        dist.destroy_process_group()
@@ -0,0 +1,125 @@
+import hashlib
+import os
+
+import numpy as np
+import torch
+
+
+def evaluate(val_loader, model, criterion, args):
+    """Single pass over val_loader returning (loss, accuracy, confusion matrix).
+
+    Loss sums and the num_class by num_class confusion matrix (rows: true class, columns:
+    prediction) are accumulated on args.device, so the host only syncs once at the end.
+    Logit adjustment follows training: subtracted from the predictions with
+    --logit_adj_post, added inside the loss with --logit_adj_train.
+    """
+
+    num_class = len(args.class_names)
+    loss_sum = torch.zeros((), device=args.device)
+    confusion = torch.zeros(num_class * num_class, dtype=torch.int64, device=args.device)
+
+    model.eval()
+    with torch.inference_mode():
+        for inputs, target, idx in val_loader:
+            inputs = inputs.to(args.device, non_blocking=True)
+            target = target.to(args.device, non_blocking=True)
+
+            output = model(inputs)
+            if args.logit_adj_post:
+                loss = criterion(output, target)
+                output = output - args.logit_adjustments
+            elif args.logit_adj_train:
+                loss = criterion(output + args.logit_adjustments, target)
+            else:
+                loss = criterion(output, target)
+
+            loss_sum += loss.sum()
+            predicted = output.argmax(1)
+            confusion += torch.bincount(target * num_class + predicted, minlength=num_class * num_class)
+
+    confusion = confusion.view(num_class, num_class).cpu()
+    num_samples = confusion.sum().item()
+    loss = loss_sum.item() / num_samples
+    acc = 100.0 * confusion.diagonal().sum().item() / num_samples
+    return loss, acc, confusion
+
+
+def class_results(confusion, class_names, acc=None):
+    """Per class accuracies ("class/<name>"), their mean "AA" and, if given, the overall accuracy "OA" """
+
+    class_acc = 100.0 * confusion.diagonal().double() / confusion.sum(1).clamp_min(1).double()
+    results = {"class/" + name: acc_i for name, acc_i in zip(class_names, class_acc.tolist())}
+    results["AA"] = class_acc.mean().item()
+    if acc is not None:
+        results["OA"] = acc
+    return results
+
+
+def collect_logits(val_loader, model, args):
+    """Raw logits and labels of the whole val_loader, one inference_mode pass, kept on args.device"""
+
+    logits, labels = [], []
+    model.eval()
+    with torch.inference_mode():
+        for inputs, target, idx in val_loader:
+            logits.append(model(inputs.to(args.device, non_blocking=True)))
+            labels.append(target.to(args.device, non_blocking=True))
+    return torch.cat(logits), torch.cat(labels)
+
+
+def file_hash(path, chunk_size=2 ** 20):
+    """sha256 hex digest of a file's contents"""
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cached_logits(val_loader, model, args, checkpoint_path):
+    """collect_logits, cached next to the checkpoint in logits_<hash>.npz.
+
+    The key is the hash of the checkpoint file, so retraining into the same folder
+    never reuses stale logits.
+    """
+
+    cache_path = os.path.join(os.path.dirname(checkpoint_path),
+                              "logits_{}.npz".format(file_hash(checkpoint_path)[:16]))
+    if os.path.isfile(cache_path):
+        with np.load(cache_path) as cache:
+            return (torch.from_numpy(cache["logits"]).to(args.device),
+                    torch.from_numpy(cache["labels"]).to(args.device))
+
+    logits, labels = collect_logits(val_loader, model, args)
+    tmp_path = cache_path + ".tmp.npz"
+    np.savez(tmp_path, logits=logits.cpu().numpy(), labels=labels.cpu().numpy())
+    os.replace(tmp_path, cache_path)
+    return logits, labels
+
+
+def sweep_adjustments(logits, labels, adjustments, memory_mb=256):
+    """Accuracies and confusion matrices of post hoc adjusted logits for many adjustments at once.
+
+    ``adjustments`` is T by num_class (one row per tau); returns (T accuracies, T by C by C
+    confusion matrices). Taus are processed in chunks whose adjusted logits take about
+    ``memory_mb``.
+    """
+
+    num_taus, num_class = adjustments.shape
+    num_samples = labels.size(0)
+    itemsize = max(logits.element_size(), adjustments.element_size())
+    chunk = max(1, int(memory_mb * 2 ** 20 // (num_samples * num_class * itemsize)))
+    confusion = []
+    for start in range(0, num_taus, chunk):
+        # same dtype promotion as evaluate, so argmax ties break identically
+        adj = adjustments[start:start + chunk]
+        predicted = (logits.unsqueeze(0) - adj.unsqueeze(1)).argmax(2)
+        # one bincount over (tau, true class, prediction) for the whole chunk
+        offsets = torch.arange(adj.size(0), device=logits.device).unsqueeze(1) * num_class * num_class
+        keys = offsets + labels.unsqueeze(0) * num_class + predicted
+        confusion.append(torch.bincount(keys.flatten(), minlength=adj.size(0) * num_class * num_class)
+                         .view(adj.size(0), num_class, num_class))
+    confusion = torch.cat(confusion).cpu()
+    acc = 100.0 * confusion.diagonal(dim1=1, dim2=2).sum(1).double() / num_samples
+    return acc, confusion
@@ -0,0 +1,192 @@
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+GRAD_ENGINES = ["loop", "closed_form", "functorch"]
+GRAD_HEADS = ["bias", "linear"]
+
+
+def unwrap(model):
+    """Returns the bare ResNet behind a DataParallel/DistributedDataParallel wrapper"""
+
+    return model.module if hasattr(model, "module") else model
+
+
+def head_parameters(model, head="bias"):
+    """Parameters of the linear head that per sample gradients are taken w.r.t."""
+
+    linear = unwrap(model).linear
+    if head == "bias":
+        # same tensor as list(model.parameters())[-1]
+        return [linear.bias]
+    return [linear.weight, linear.bias]
+
+
+def head_error(logits, target):
+    """softmax(logits) - onehot(target), i.e. d(cross entropy)/d(logits) for every sample"""
+
+    probs = F.softmax(logits, dim=1)
+    return probs - F.one_hot(target, logits.size(1)).to(probs.dtype)
+
+
+def loop_per_sample_gradients(model, x, target, criterion, head="bias"):
+    """Reference implementation: one autograd call per sample through the linear head"""
+
+    with torch.no_grad():
+        features = model(x, layer=1)
+
+    linear = unwrap(model).linear
+    params = head_parameters(model, head)
+    grads = []
+    for i, f in enumerate(features):
+        loss = criterion(linear(f), target[i])
+        loss = loss.mean()
+        grad = torch.autograd.grad(loss, params)
+        grads.append(torch.cat([g.flatten() for g in grad]))
+
+    return torch.stack(grads)
+
+
+def closed_form_per_sample_gradients(features, logits, target, head="bias"):
+    """Per sample cross entropy gradients of the linear head from one batched computation.
+
+    For logits = W f + b the gradient of sample i is e_i f_i^T w.r.t. W and e_i w.r.t. b,
+    with e_i = softmax(logits_i) - onehot(y_i). Rows follow the parameter layout of
+    ``head_parameters`` (weight flattened row major, then bias).
+    """
+
+    error = head_error(logits, target)
+    if head == "bias":
+        return error
+    weight_grads = torch.einsum('bc,bd->bcd', error, features).flatten(1)
+    return torch.cat([weight_grads, error], dim=1)
+
+
+def _features_and_logits(model, x, features=None, logits=None):
+    """Reuses the (feature, logits) of a fused forward, model(x, layer=2), when given"""
+
+    if features is None or logits is None:
+        with torch.no_grad():
+            features, logits = model(x, layer=2)
+    return features.detach(), logits.detach()
+
+
+def select_parameters(model, layers):
+    """Parameters whose name is, or lies under, one of the module / parameter names in ``layers``"""
+
+    selected = {name: p for name, p in unwrap(model).named_parameters()
+                if any(name == layer or name.startswith(layer + ".") for layer in layers)}
+    if not selected:
+        raise ValueError("no parameters match layers {}".format(list(layers)))
+    return selected
+
+
+def batch_norm_statistics(model, x):
+    """Batch mean and (biased) variance every BatchNorm layer normalizes ``x`` with in train mode.
+
+    Keyed like the running stat buffers they stand in for. The forward runs on copies of the
+    buffers, so the model's running statistics are left untouched.
+    """
+
+    from torch.func import functional_call
+
+    net = unwrap(model)
+    stats = {}
+
+    def capture(name):
+        def hook(module, inputs, output):
+            inp = inputs[0]
+            dims = [0] + list(range(2, inp.dim()))
+            stats[name + ".running_mean"] = inp.mean(dims)
+            stats[name + ".running_var"] = inp.var(dims, unbiased=False)
+        return hook
+
+    handles = [module.register_forward_hook(capture(name)) for name, module in net.named_modules()
+               if isinstance(module, nn.modules.batchnorm._BatchNorm)]
+    try:
+        with torch.no_grad():
+            functional_call(net, {name: b.clone() for name, b in net.named_buffers()}, (x,))
+    finally:
+        for handle in handles:
+            handle.remove()
+    return stats
+
+
+def compute_loss(params, buffers, sample, target, model, criterion):
+    """Loss of a single sample as a function of the parameters, for torch.func transforms"""
+
+    from torch.func import functional_call
+
+    batch = sample.unsqueeze(0)
+    targets = target.unsqueeze(0)
+
+    predictions = functional_call(model, (params, buffers), (batch,))
+    loss = criterion(predictions, targets)
+    return loss.mean()
+
+
+def _compute_selected_loss(selected, frozen, buffers, sample, target, model, criterion):
+    return compute_loss({**frozen, **selected}, buffers, sample, target, model, criterion)
+
+
+def functorch_per_sample_gradients(model, x, target, criterion, layers=("layer3", "linear"), memory_mb=1024):
+    """Per sample gradients w.r.t. any subset of the network via torch.func grad + vmap.
+
+    BatchNorm layers normalize every sample with the statistics of the whole batch, as in the
+    training forward, held constant. The batch is processed in chunks sized so that the
+    per sample gradients of a chunk take about ``memory_mb`` (twice, for vmap's output and the
+    flattened copy).
+    """
+
+    from torch.func import grad, vmap
+
+    net = unwrap(model)
+    selected = {name: p.detach() for name, p in select_parameters(net, layers).items()}
+    frozen = {name: p.detach() for name, p in net.named_parameters() if name not in selected}
+    buffers = dict(net.named_buffers())
+    if net.training:
+        buffers.update(batch_norm_statistics(net, x))
+
+    dim = sum(p.numel() for p in selected.values())
+    chunk_size = max(1, int(memory_mb * 2 ** 20 // (2 * dim * x.element_size())))
+    per_sample_grad = vmap(grad(_compute_selected_loss), in_dims=(None, None, None, 0, 0, None, None))
+
+    grads = torch.empty(x.size(0), dim, dtype=x.dtype, device=x.device)
+    was_training = net.training
+    # eval mode makes BatchNorm use the batch statistics passed in as buffers
+    net.eval()
+    try:
+        for start in range(0, x.size(0), chunk_size):
+            end = start + chunk_size
+            chunk_grads = per_sample_grad(selected, frozen, buffers, x[start:end], target[start:end], net, criterion)
+            grads[start:end] = torch.cat([chunk_grads[name].flatten(1) for name in selected], dim=1)
+    finally:
+        net.train(was_training)
+    return grads
+
+
+def head_factors(model, x, target, features=None, logits=None):
+    """Returns (features, error), the two factors every per sample head gradient is built from"""
+
+    features, logits = _features_and_logits(model, x, features, logits)
+    return features, head_error(logits, target)
+
+
+def compute_per_sample_gradients(model, x, target, criterion, engine="closed_form", head="bias",
+                                 features=None, logits=None, layers=None, memory_mb=1024):
+    """Returns the B by d matrix of per sample gradients.
+
+    The loop and closed form engines differentiate the linear head (``head``); the closed form
+    engine needs no forward of its own when the features and logits of the training forward
+    are passed in. The functorch engine differentiates ``layers``, defaulting to the head.
+    """
+
+    if engine == "loop":
+        return loop_per_sample_gradients(model, x, target, criterion, head)
+    if engine == "functorch":
+        if not layers:
+            layers = ["linear.bias"] if head == "bias" else ["linear"]
+        return functorch_per_sample_gradients(model, x, target, criterion, layers, memory_mb)
+
+    features, logits = _features_and_logits(model, x, features, logits)
+    return closed_form_per_sample_gradients(features, logits, target, head)
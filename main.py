@@ -6,40 +6,67 @@ import torch.nn.parallel
 import torch.backends.cudnn as cudnn
 import torch.optim
 import torch.utils.data
-from torch.utils.tensorboard import SummaryWriter
 import utils
+import gradients
+import similarity
+import weighting
+import scores
+import sketch
+import memory_bank
+import regularization
+import evaluation
+import distributed
+import checkpoint
+import metrics
+import profiling
 from model import resnet32
 from config import get_arguments
 import numpy as np
-import math
 import time
 import torch.nn.functional as F
-import json
-from torchvision.utils import save_image
 
 
-parser = get_arguments()
-args = parser.parse_args()
-device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-args.device = device
-exp_loc, model_loc = utils.log_folders(args)
-scores_dir = utils.score_folders(args)
-writer = SummaryWriter(log_dir=exp_loc)
-score = {}
+def main(argv=None):
+    """Main script"""
 
+    run(get_arguments().parse_args(argv))
 
-def main():
-    """Main script"""
 
+def run(args, on_step=None):
+    """Trains one configuration (or sweeps post hoc taus with --logit_adj_post) from parsed config.py arguments.
+
+    Importing this module has no side effects; folders, the Tensorboard writer and the
+    process group are only created here. ``on_step(step)`` is called after every optimizer step.
+    """
+
+    args.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    distributed.init(args)
+    device = args.device
+    exp_loc, model_loc = utils.log_folders(args)
+    scores_dir = utils.score_folders(args)
+    writer = metrics.MetricsWriter(exp_loc) if distributed.is_main(args) else distributed.NullWriter()
+    prof = profiling.Profiler(args.profile, device, os.path.join(exp_loc, "trace_rank{}.json".format(args.rank)),
+                              args.profile_trace)
     assert not (args.logit_adj_post and args.logit_adj_train)
+    assert not (args.grad_layers and args.gram_backend == 'kron'), "the kron Gram only covers the linear head"
+    assert not args.grad_layers or args.grad_engine == 'functorch', "--grad_layers needs the functorch engine"
+    assert not (args.sketch != 'none' and args.gram_backend == 'kron'), "sketching needs the dense Gram"
+    assert not (args.bank_size and args.gram_backend == 'kron'), "the gradient bank needs the dense Gram"
+    assert args.br or args.keep_ratio >= 1, "score driven pruning needs the --br scores"
+    assert not (args.distributed and args.keep_ratio < 1), "score driven pruning is single process only"
     # train_dataset, val_loader, num_train = utils.get_loaders(args)
     train_loader, val_loader, num_train= utils.get_loaders_v2(args)
+    score = scores.ScoreStore(num_train, device, args.score_history)
+    score_writer = scores.ScoreWriter(scores_dir)
+    state = TrainContext(args, score, writer, prof, on_step=on_step)
 
     num_class = len(args.class_names)
-    model = torch.nn.DataParallel(resnet32(num_classes=num_class))
+    model = distributed.wrap(resnet32(num_classes=num_class).to(device), args)
     # model = resnet32(num_classes=num_class)
 
     model = model.to(device)
+    # evaluation runs on rank 0 only, outside the DDP wrapper so no rank waits on it
+    eval_model = gradients.unwrap(model) if args.distributed else model
     cudnn.benchmark = True
     criterion = nn.CrossEntropyLoss(reduction='none').to(device)
     
@@ -52,48 +79,84 @@ def main():
     if args.logit_adj_post:
         if os.path.isfile(os.path.join(model_loc, "model.th")):
             print("=> loading pretrained model ")
-            checkpoint = torch.load(os.path.join(model_loc, "model.th"))
-            model.load_state_dict(checkpoint['state_dict'])
-            for tro in args.tro_post_range:
+            pretrained = torch.load(os.path.join(model_loc, "model.th"))
+            model.load_state_dict(pretrained['state_dict'])
+            # test logits once per checkpoint and class counts once, then every tau in one sweep
+            logits, labels = evaluation.cached_logits(val_loader, model, args, os.path.join(model_loc, "model.th"))
+            counts = utils.label_counts(train_loader, args)
+            taus = args.tro_post_grid or args.tro_post_range
+            adjustments = utils.adjustment_from_counts(counts, torch.tensor(taus, dtype=torch.float64), device)
+            accs, confusions = evaluation.sweep_adjustments(logits, labels, adjustments)
+            for tro, val_acc, confusion in zip(taus, accs.tolist(), confusions):
                 args.tro = tro
-                args.logit_adjustments = utils.compute_adjustment(train_loader, tro, args)
-                val_loss, val_acc = validate(val_loader, model, criterion)
-                results = utils.class_accuracy(val_loader, model, args)
-                results["OA"] = val_acc
+                results = evaluation.class_results(confusion, args.class_names, val_acc)
                 pprint(results)
                 hyper_param = utils.log_hyperparameter(args, tro)
                 writer.add_hparams(hparam_dict=hyper_param, metric_dict=results)
-                writer.close()
         else:
             print("=> No pre trained model found")
 
+        writer.close()
         return
 
    
 
     args.logit_adjustments = utils.compute_adjustment(train_loader, args.tro_train, args)
 
-    optimizer = torch.optim.SGD(model.parameters(),
-                                args.lr,
-                                momentum=args.momentum,
-                                weight_decay=args.weight_decay,
-                                nesterov=True)
+    optimizer = regularization.build_optimizer(model.parameters(), args)
     lr_scheduler = torch.optim.lr_scheduler.MultiStepLR(optimizer,
                                                         milestones=args.scheduler_steps)
 
-    loop = tqdm(range(0, args.epochs), total=args.epochs, leave=False)
-    val_loss, val_acc = 0, 0
+    # the log folder name only covers some flags, checkpoints record the whole configuration
+    config = checkpoint.resume_config(args, vars(get_arguments().parse_args([])))
+    start_epoch = 0
+    # optimizer steps taken so far; epoch * len(train_loader) is not monotonic once
+    # --keep_ratio shrinks the epochs
+    step = 0
+    if args.resume:
+        saved = checkpoint.load_latest(model_loc)
+        if saved is not None:
+            mismatch = checkpoint.config_mismatch(saved.get("config", {}), config)
+            if mismatch:
+                raise ValueError("checkpoint in {} was written with different {}, rerun with its flags or without "
+                                 "--resume".format(model_loc, ", ".join(mismatch)))
+            print("=> resuming after epoch {}".format(saved["epoch"]))
+            model.load_state_dict(saved["state_dict"])
+            optimizer.load_state_dict(saved["optimizer"])
+            lr_scheduler.load_state_dict(saved["lr_scheduler"])
+            score.load_state_dict(saved["score"])
+            checkpoint.set_rng_state(saved["rng"])
+            start_epoch = saved["epoch"] + 1
+            step = saved.get("step", start_epoch * len(train_loader))
+    checkpoint_writer = checkpoint.CheckpointWriter(model_loc, args.checkpoint_keep)
+
+    loop = tqdm(range(start_epoch, args.epochs), total=args.epochs, initial=start_epoch, leave=False,
+                disable=not distributed.is_main(args))
+    val_loss, val_acc, confusion = 0, 0, None
+    # the last epoch that ran and the last one validated, the final results must describe the final model
+    last_epoch, val_epoch = start_epoch - 1, None
     for epoch in loop:
+        epoch_start = time.time()
+        if args.dist_sampler is not None:
+            args.dist_sampler.set_epoch(epoch)
+        if args.train_sampler is not None:
+            args.train_sampler.set_epoch(epoch, score)
+            writer.add_scalar("train/kept_samples", len(args.train_sampler), epoch)
          # train for one epoch
         # train_loss, train_acc = train(train_dataset, model, criterion, optimizer,num_train,gamma,z,epoch)
-        train_loss, train_acc = train_v2(train_loader, model, criterion, optimizer, num_train, gamma, z, epoch,compute_loss)
+        train_loss, train_acc, steps = train_v2(train_loader, model, criterion, optimizer, num_train, gamma, z, epoch,
+                                                gradients.compute_loss, state, step)
+        step += steps
         writer.add_scalar("train/acc", train_acc, epoch)
         writer.add_scalar("train/loss", train_loss, epoch)
+        writer.add_scalar("train/epoch_time", time.time() - epoch_start, epoch)
         lr_scheduler.step()
 
         # evaluate on validation set
-        if (epoch % args.log_val) == 0 or (epoch == (args.epochs - 1)):
-            val_loss, val_acc = validate(val_loader, model, criterion)
+        if ((epoch % args.log_val) == 0 or (epoch == (args.epochs - 1))) and distributed.is_main(args):
+            with prof.span("evaluate"):
+                val_loss, val_acc, confusion = evaluation.evaluate(val_loader, eval_model, criterion, args)
+                val_epoch = epoch
             writer.add_scalar("val/acc", val_acc, epoch)
             writer.add_scalar("val/loss", val_loss, epoch)
 
@@ -102,34 +165,53 @@ def main():
                          train_acc=f"{train_acc:.2f}",
                          val_acc=f"{val_acc:.2f}")
 
-        records = []
         if args.br:
-            for _, (inputs, target,idx) in enumerate(train_loader):
-                 
-                for i, index in enumerate(idx): 
-                    index = int(index)
-                    record = [index, score[index].cpu(), int(target[i])]
-                    records.append(record)
-                    
-                    # class_name = int(target[i])
-                    # class_cnt[class_name] += 1
-                    # image_name = args.save_dir+'/label_'+ str(class_name) + '_' + str(class_cnt[class_name]) +'_'+str(score[item]) + '.png'
-                    # save_image(item, image_name)
-            records = np.array(records)
-            filename = os.path.join(scores_dir, 'score.npy')
-            with open(filename, 'wb') as f:
-                np.save(f, records)
+            with prof.span("score_dump"):
+                distributed.merge_scores(score)
+                score.snapshot()
+                if distributed.is_main(args):
+                    score_writer.write(score.columns())
+                    if args.score_history:
+                        score_writer.write(score.history_numpy(), 'score_history.npy')
+
+        if args.checkpoint_every and (epoch + 1) % args.checkpoint_every == 0 and distributed.is_main(args):
+            with prof.span("checkpoint"):
+                checkpoint_writer.save({"epoch": epoch,
+                                        "step": step,
+                                        "config": config,
+                                        "state_dict": model.state_dict(),
+                                        "optimizer": optimizer.state_dict(),
+                                        "lr_scheduler": lr_scheduler.state_dict(),
+                                        "score": score.state_dict(),
+                                        "rng": checkpoint.rng_state()}, epoch)
+
+        if args.profile:
+            for name, value in prof.epoch_summary().items():
+                writer.add_scalar("profile/" + name, value, epoch)
+        last_epoch = epoch
+        if args.max_steps and step >= args.max_steps:
+            break
  
+    score_writer.close()
+    checkpoint_writer.close()
+    prof.close()
+    if not distributed.is_main(args):
+        distributed.cleanup()
+        return
+
     file_name = 'model.th'
     mdel_data = {"state_dict": model.state_dict()}
     torch.save(mdel_data, os.path.join(model_loc, file_name))
 
-    results = utils.class_accuracy(val_loader, model, args)
-    results["OA"] = val_acc
+    # --max_steps or a resume can end the run on an epoch that did not validate
+    if val_epoch != last_epoch:
+        val_loss, val_acc, confusion = evaluation.evaluate(val_loader, eval_model, criterion, args)
+    results = evaluation.class_results(confusion, args.class_names, val_acc)
     hyper_param = utils.log_hyperparameter(args, args.tro_train)
     pprint(results)
     writer.add_hparams(hparam_dict=hyper_param, metric_dict=results)
     writer.close()
+    distributed.cleanup()
 
 
      
@@ -137,7 +219,6 @@ def main():
 
 
 def compute_grad(sample, target, criterion, model):
-    # start_time = time.time()
     prediction = model(sample)
     loss = criterion(prediction, target)
 
@@ -151,7 +232,6 @@ def compute_grad(sample, target, criterion, model):
         else:
             grads = torch.cat([grads,grad],dim=0)
 
-    # print("---compute_grad runtime is %s seconds ---" % (time.time() - start_time))
  
     return grads
 
@@ -183,47 +263,7 @@ def compute_grad(sample, target, criterion, model):
 #     # Now, gradients holds the per-sample gradients of the weights in the last_layer
 #     return gradients
 
-# my solution
-def compute_per_sample_gradients(model, x, target,criterion):
-
-    with torch.no_grad():  
-        features = model(x,layer = 1)
-
-    for i, f in enumerate(features): 
-  
-        loss = criterion(model.module.linear(f), target[i])
-        
-
-        loss = loss.mean()
-        grad = torch.autograd.grad(loss,  list(model.parameters())[-1],retain_graph=True )
-
-        grad = grad[0].flatten().unsqueeze(0)
-        if i == 0:
-            grads = grad
-        else:
-            grads = torch.cat([grads,grad],dim=0)
- 
-
-    # Now, gradients holds the per-sample gradients of the weights in the last_layer
-    return grads
-
-
-def compute_loss(params,  buffers, sample, target,model,criterion):
-    batch = sample.unsqueeze(0)
-    targets = target.unsqueeze(0)
-
-
- 
-    predictions = functional_call(model, (params, buffers), (batch,))
-    loss = criterion(predictions, targets)
-    return loss.mean()
-
-
-
-
-
 def q(model,criterion,grad_i,x_j,y_j,gamma):
-    # start_time = time.time()
 
     cos = torch.nn.CosineSimilarity(dim=0)
    
@@ -241,7 +281,6 @@ def q(model,criterion,grad_i,x_j,y_j,gamma):
     with torch.no_grad():
 
         corr = cos( grad_i[-1].flatten(), grad_j[-1].flatten() )
-    # print("---q runtime is %s seconds ---" % (time.time() - start_time))
 
     return max( corr-gamma ,0 )
 
@@ -256,150 +295,179 @@ def embedding_corr(model, output_i, x_j,gamma):
 
 
 def weighted_criterion(outputs,labels,criterion,weight):
-    # start_time = time.time()
 
     weighted_loss = torch.tensor(0)
-    weighted_loss.to(device)
+    weighted_loss.to(outputs.device)
     for i in range(len(outputs)):
         weighted_loss = weighted_loss + weight[i]*criterion(outputs[i],labels[i])
  
-    # print("---weighted_criterion runtime is %s seconds ---" % (time.time() - start_time))
 
     return weighted_loss 
 
 
-def train_v2(train_loader, model, criterion, optimizer, num_train, gamma, z, epoch,compute_loss):
-    """ Run one train epoch """
+class TrainContext:
+    """What train_v2 needs besides the model and optimizer, built once per run by run().
 
-    losses = utils.AverageMeter()
-    accuracies = utils.AverageMeter()
+    Without a writer or profiler nothing is logged or timed; the gradient sketch and bank
+    follow --sketch and --bank_size. ``args`` must carry what run() adds to the parsed
+    arguments (device, rank and world size from ``distributed.init``, the loader fields
+    from ``utils.get_loaders_v2`` and ``logit_adjustments``).
+    """
+
+    def __init__(self, args, score, writer=None, prof=None, on_step=None):
+        self.args = args
+        self.device = args.device
+        self.score = score
+        self.writer = writer if writer is not None else distributed.NullWriter()
+        self.prof = prof if prof is not None else profiling.Profiler()
+        self.on_step = on_step
+        self.grad_sketch = None
+        if args.sketch != 'none':
+            self.grad_sketch = sketch.GradientSketch(args.sketch, args.sketch_dim, args.sketch_seed,
+                                                     args.sketch_resample)
+        self.grad_bank = memory_bank.GradientBank(args.bank_size, args.bank_max_age) if args.bank_size else None
+
+
+def train_v2(train_loader, model, criterion, optimizer, num_train, gamma, z, epoch,compute_loss, state, first_step=0):
+    """ Run one train epoch, returns (loss, accuracy, number of steps taken).
+
+    ``state`` is the run's TrainContext and ``first_step`` the global step of the epoch's
+    first batch; the epoch ends early once --max_steps steps are reached.
+    """
+
+    args, device, score, writer, prof = state.args, state.device, state.score, state.writer, state.prof
+    grad_sketch, grad_bank = state.grad_sketch, state.grad_bank
+
+    # sums stay on the device, read back once at the end of the epoch
+    losses = metrics.DeviceMeter()
+    accuracies = metrics.DeviceMeter()
+    cache_hits = utils.AverageMeter()
 
     model.train()
+    # extra forwards of the gradient engines must not go through the DDP wrapper
+    grad_model = gradients.unwrap(model) if args.distributed else model
+    gather = distributed.all_gather if args.distributed else None
     
  
-    for _, (inputs, target,idx) in enumerate(train_loader):
-        target = target.to(device)
-        input_var = inputs.to(device)
-        target_var = target
+    steps = 0
+    for i, (inputs, target,idx) in enumerate(prof.iterate(train_loader)):
+        if args.max_steps and first_step + i >= args.max_steps:
+            break
+        with prof.span("augment"):
+            target = target.to(device)
+            input_var = inputs.to(device)
+            target_var = target
+            if args.train_augment is not None:
+                input_var = args.train_augment(input_var)
   
                 
-        output = model(input_var)
+        with prof.span("forward"):
+            features, output = model(input_var, layer=2)
 
+        # per sample gradients are taken w.r.t. the unadjusted logits
+        logits = output.detach()
         if args.logit_adj_train:
             output = output + args.logit_adjustments
         weighted_loss = 0
         if args.br:
-            grads = compute_per_sample_gradients(model, input_var, target_var,criterion)
-            if args.norm:
-                grads = F.normalize(grads,p=2.0) 
-
-            grads_t = torch.transpose(grads, 0, 1)
-            if args.temp_decay:
-                temp = args.temp*(epoch/100+1)
+            step = first_step + i
+            due = (epoch if args.update_unit == 'epochs' else step) % args.update_gap == 0
+            refresh = due or not score.is_cached(idx)
+            if args.distributed and not due:
+                # every rank has to take the same branch, the refresh path gathers across ranks
+                refresh = distributed.any_rank(refresh, device)
+            cache_hits.update(0 if refresh else 100)
+            if refresh:
+                num_keys = None
+                with prof.span("per_sample_grads"):
+                    if args.gram_backend == 'kron':
+                        head_features, error = gradients.head_factors(grad_model, input_var, target_var, features, logits)
+                        head_features, error = distributed.all_gather(head_features), distributed.all_gather(error)
+                        gram_rows = similarity.kron_gram_rows(head_features, error, args.grad_head, args.norm)
+                    else:
+                        grads = gradients.compute_per_sample_gradients(grad_model, input_var, target_var, criterion,
+                                                                       args.grad_engine, args.grad_head,
+                                                                       features, logits, args.grad_layers,
+                                                                       args.grad_memory_mb)
+                        if grad_sketch is not None:
+                            grads = grad_sketch(grads, step)
+                        # the Gram spans the batches of all ranks
+                        grads = distributed.all_gather(grads)
+                        if grad_bank is not None:
+                            if args.norm:
+                                grads = F.normalize(grads, p=2.0)
+                            gram_rows, num_keys = grad_bank.gram_rows(grads, step)
+                        else:
+                            gram_rows = similarity.dense_gram_rows(grads, args.norm)
+
+                with prof.span("gram"):
+                    # this rank counts the rows of its own samples against the global batch
+                    global_size = input_var.size(0) * args.world_size
+                    start = args.rank * input_var.size(0)
+                    # bank rows also span every bank slot, tiles are sized by the real row width
+                    width = global_size + grad_bank.size if num_keys is not None else global_size
+                    buffers = similarity.row_buffers(args.gram_backend, args.grad_head)
+                    counts = similarity.tiled_threshold_counts(gram_rows, global_size, gamma, args.off_diag,
+                                                               args.gram_tile_mb, start, start + input_var.size(0),
+                                                               width, buffers)
+                    if num_keys is not None:
+                        grad_bank.enqueue(grads, step)
+                        # rescale to the batch so temp and the inverse weighting keep their meaning
+                        counts = counts * global_size / num_keys
+                    score.cache_counts(idx, counts)
             else:
-                temp = args.temp
-            gram = torch.matmul(grads,grads_t) 
-            gram = gram - args.off_diag*torch.eye(gram.size(0)).to(device)
-            
-            # gram = F.relu(torch.sub(gram,gamma))
-            weights = [(row>=gamma).sum() for row in gram]
-            # weights = torch.sum(gram, 1)
-            #compute cumulative score
-            for i, index in enumerate(idx):
-                index = int(index)
-                if index in score:
-                    score[index] += weights[i] 
-                    score[index] = score[index]/(epoch+1)
-                else:
-                    score[index] = weights[i]
-                if args.cumulative:
-                    weights[i] = score[index]
-            weights = torch.tensor(weights).to(device)
-            weights = weights/temp
-            if args.wo == 0:
-                weights = F.softmax(-weights)
-            elif args.wo == 1:
-                weights = torch.tensor([args.batch_size/number for number in weights]).to(device)
-            weights = weights.detach()
-            
-            if args.measure == 1:
-                features = model(x,layer = 1)
-                features = F.normalize(features,p=2.0)
-                features_t = torch.transpose(features, 0, 1)
-                ft_gram = torch.matmul(features,features_t)
-                ft_gram = F.relu(torch.sub(ft_gram,gamma))
-                ft_weights = torch.sum(ft_gram, 1)
-                ft_weights = ft_weights/temp
-                ft_weights = F.softmax(-ft_weights)
-                ft_weights = ft_weights.detach()
-                alpha = epoch/1241
-                weights = (1-alpha)*weights + alpha*ft_weights
-                weights.detach()
-            
+                # cached counts from the last refresh, no per sample gradient work
+                counts = score.cached_counts(idx)
+            with prof.span("weighting"):
+                weights = weighting.batch_weights(counts, idx, epoch, args, score, features, update=refresh,
+                                                  gather=gather)
+                if args.distributed:
+                    # DDP averages gradients over ranks, scale back to the sum over the global batch
+                    weights = distributed.local_rows(weights, input_var.size(0), args) * args.world_size
+                score.record_labels(idx, target)
        
-        acc = utils.accuracy(output.data, target)
+        acc = metrics.correct_predictions(output.detach(), target)
 
-        loss = criterion(output, target_var)
+        with prof.span("backward"):
+            loss = criterion(output, target_var)
 
-        if args.br:
-            weighted_loss = torch.inner(loss,weights)
+            if args.br:
+                weighted_loss = torch.inner(loss,weights)
 
-        loss=loss.mean()
-        loss_r = 0
-        for parameter in model.parameters():
-            loss_r += torch.sum(parameter ** 2)
-        loss = loss + args.weight_decay * loss_r
-        if args.br:
-            weighted_loss = weighted_loss + args.weight_decay * loss_r
-
-        optimizer.zero_grad()
-        if args.br:
-            weighted_loss.backward()
-        else:
-            loss.backward()
-        optimizer.step()
+            loss=loss.mean()
 
-        losses.update(loss.item(), inputs.size(0))
+            optimizer.zero_grad()
+            if args.br:
+                weighted_loss.backward()
+            else:
+                loss.backward()
+            if args.reg_mode == "double":
+                # report the loss including the l2 term of the pre-step parameters, as before
+                loss = loss + args.weight_decay * regularization.l2_penalty(model.parameters())
+        with prof.span("optimizer"):
+            if args.reg_mode == "decoupled":
+                regularization.decoupled_decay_(optimizer, args.weight_decay)
+            optimizer.step()
+
+        losses.update(loss, inputs.size(0))
         accuracies.update(acc, inputs.size(0))
+        if args.log_interval and (i + 1) % args.log_interval == 0:
+            step = first_step + i
+            writer.add_scalar("train/running_loss", losses.running_avg(), step)
+            writer.add_scalar("train/running_acc", accuracies.running_avg(), step)
+        prof.step()
+        steps += 1
+        if state.on_step is not None:
+            state.on_step(first_step + i)
 
-    return losses.avg, accuracies.avg
+    if args.br:
+        writer.add_scalar("train/weight_cache_hits", cache_hits.avg, epoch)
+    return distributed.mean_over_ranks(losses.avg, device), distributed.mean_over_ranks(accuracies.avg, device), steps
 
 
 
  
 
 
-def validate(val_loader, model, criterion):
-    """ Run evaluation """
-
-    losses = utils.AverageMeter()
-    accuracies = utils.AverageMeter()
-
-    model.eval()
-
-    with torch.no_grad():
-        for _, (inputs, target,idx) in enumerate(val_loader):
-           
-            target = target.to(device)
-            input_var = inputs.to(device)
-            target_var = target.to(device)
-
-            output = model(input_var)
-            loss = criterion(output, target_var)
-            loss = loss.mean()
-            if args.logit_adj_post:
-                output = output - args.logit_adjustments
-
-            elif args.logit_adj_train:
-                loss = criterion(output + args.logit_adjustments, target_var)
-            loss = loss.mean()
-
-            acc = utils.accuracy(output.data, target)
-            losses.update(loss.item(), inputs.size(0))
-            accuracies.update(acc, inputs.size(0))
-
-    return losses.avg, accuracies.avg
-
-
 if __name__ == '__main__':
     main()
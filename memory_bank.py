@@ -0,0 +1,60 @@
+import torch
+
+
+class GradientBank:
+    """Fixed size ring buffer of recent per sample gradients (or sketches) on the training device.
+
+    Lets the similarity counts of a batch include samples of the last few batches: the batch
+    is compared against itself and the whole bank in one matmul per row block, and empty or
+    stale bank slots are masked out rather than gathered, so nothing syncs with the host.
+    Entries older than ``max_age`` steps are stale (``max_age=0`` keeps them until overwritten).
+    """
+
+    def __init__(self, size, max_age=0):
+        self.size = size
+        self.max_age = max_age
+        self.keys = None
+        self.steps = None
+        self.position = 0
+
+    def _allocate(self, grads):
+        self.keys = torch.zeros(self.size, grads.size(1), dtype=grads.dtype, device=grads.device)
+        self.steps = torch.full((self.size,), -1, dtype=torch.int64, device=grads.device)
+        self.position = 0
+
+    def valid(self, step):
+        """Mask of the bank slots a batch at ``step`` is compared against"""
+
+        valid = self.steps >= 0
+        if self.max_age:
+            valid &= (step - self.steps) <= self.max_age
+        return valid
+
+    def gram_rows(self, grads, step):
+        """Returns (rows, num_keys): rows(start, end) of the similarities of ``grads`` with
+        [grads; bank], and the number of samples each row is compared against. A row has
+        ``grads.size(0) + size`` columns.
+
+        ``grads`` are expected to be normalized already if cosine similarities are wanted.
+        """
+
+        if self.keys is None or self.keys.size(1) != grads.size(1):
+            self._allocate(grads)
+        valid = self.valid(step)
+        keys_t = torch.transpose(torch.cat([grads, self.keys]), 0, 1)
+        batch_size = grads.size(0)
+
+        def rows(start, end):
+            block = torch.matmul(grads[start:end], keys_t)
+            block[:, batch_size:].masked_fill_(~valid, float('-inf'))
+            return block
+        return rows, batch_size + valid.sum()
+
+    def enqueue(self, grads, step):
+        """Overwrites the oldest slots with a batch, one index_copy_ regardless of bank size"""
+
+        grads = grads.detach()[-self.size:]
+        positions = (self.position + torch.arange(grads.size(0), device=grads.device)) % self.size
+        self.keys.index_copy_(0, positions, grads)
+        self.steps.index_fill_(0, positions, step)
+        self.position = (self.position + grads.size(0)) % self.size
@@ -0,0 +1,74 @@
+import torch
+
+from background import BackgroundWriter
+
+
+class DeviceMeter:
+    """AverageMeter whose running sum stays on the device of the values it is fed.
+
+    ``update`` only queues kernels; the host reads the sum back when ``avg`` is accessed.
+    The sum is kept in float64 so averages match accumulating ``.item()`` values in Python.
+    """
+
+    def __init__(self):
+        self.sum = None
+        self.count = 0
+
+    def update(self, val, n=1):
+        val = val.detach().to(torch.float64) * n
+        self.sum = val if self.sum is None else self.sum + val
+        self.count += n
+
+    def running_avg(self):
+        """Average as a device tensor, no sync"""
+
+        return self.sum / self.count
+
+    @property
+    def avg(self):
+        return self.running_avg().item() if self.count else 0
+
+
+def correct_predictions(outputs, labels):
+    """Percentage of correct top-1 predictions as a device tensor, see utils.accuracy"""
+
+    _, predicted = torch.max(outputs, 1)
+    # same float64 arithmetic as the python version
+    return (predicted == labels).sum().to(torch.float64) * 100.0 / labels.size(0)
+
+
+class MetricsWriter(BackgroundWriter):
+    """Forwards scalars to a SummaryWriter in ``log_dir`` from a background thread.
+
+    Values may be device tensors; they are read back on the writer thread, so logging
+    never blocks the training loop. Events are written in submission order.
+    """
+
+    def __init__(self, log_dir):
+        from torch.utils.tensorboard import SummaryWriter
+
+        super().__init__()
+        self._writer = SummaryWriter(log_dir=log_dir)
+
+    @staticmethod
+    def _value(value):
+        return value.item() if torch.is_tensor(value) else value
+
+    def add_scalar(self, tag, value, step):
+        self.submit(lambda: self._writer.add_scalar(tag, MetricsWriter._value(value), step))
+
+    def add_hparams(self, hparam_dict, metric_dict):
+        metric_dict = dict(metric_dict)
+        self.submit(lambda: self._writer.add_hparams(
+            hparam_dict, {key: MetricsWriter._value(value) for key, value in metric_dict.items()}))
+
+    def flush(self):
+        """Blocks until every queued event is written"""
+
+        self.submit(self._writer.flush)
+        self.wait()
+
+    def close(self):
+        self.flush()
+        super().close()
+        self._writer.close()
@@ -91,7 +91,7 @@ class ResNet(nn.Module):
 
         return nn.Sequential(*layers)
 
-    def forward(self, x, layer=0):  # when layer = 1, only output last layer feature.
+    def forward(self, x, layer=0):  # when layer = 1, only output last layer feature. when layer = 2, output (feature, logits).
         x = self.padd(x)
         out = self.act(self.bn1(self.conv1(x)))
         out = self.layer1(out)
@@ -102,6 +102,8 @@ class ResNet(nn.Module):
         out = out.view(out.size(0), -1)
         if layer == 1:
             return out
+        if layer == 2:
+            return out, self.linear(out)
         out = self.linear(out)
         return out
 
@@ -0,0 +1,103 @@
+import contextlib
+import time
+from collections import defaultdict
+
+import torch
+
+_NULL_SPAN = contextlib.nullcontext()
+
+
+class Profiler:
+    """Named spans around the stages of a training step.
+
+    Disabled, ``span`` returns a shared null context and ``iterate`` the iterable itself, so
+    instrumented code pays one attribute lookup per span. Enabled, every span synchronizes
+    the device on entry and exit so its wall time belongs to that stage alone, and is
+    summed per epoch together with the peak memory. With ``trace_steps=(start, stop)`` the
+    steps [start, stop) of this process are also recorded by torch.profiler and exported
+    as a Chrome/Perfetto trace to ``trace_path``.
+    """
+
+    def __init__(self, enabled=False, device='cpu', trace_path=None, trace_steps=None):
+        self.enabled = enabled
+        self.device = torch.device(device)
+        self.totals = defaultdict(float)
+        self.calls = defaultdict(int)
+        self._trace = None
+        if enabled and trace_steps:
+            start, stop = trace_steps
+            activities = [torch.profiler.ProfilerActivity.CPU]
+            if self.device.type == 'cuda':
+                activities.append(torch.profiler.ProfilerActivity.CUDA)
+            self._trace = torch.profiler.profile(
+                activities=activities,
+                schedule=torch.profiler.schedule(wait=max(start - 1, 0), warmup=min(start, 1),
+                                                 active=stop - start, repeat=1),
+                on_trace_ready=lambda profile: profile.export_chrome_trace(trace_path),
+                profile_memory=True)
+            self._trace.start()
+
+    def _sync(self):
+        if self.device.type == 'cuda':
+            torch.cuda.synchronize(self.device)
+
+    def span(self, name):
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._span(name)
+
+    @contextlib.contextmanager
+    def _span(self, name):
+        self._sync()
+        start = time.perf_counter()
+        with torch.profiler.record_function(name):
+            yield
+        self._sync()
+        self.totals[name] += time.perf_counter() - start
+        self.calls[name] += 1
+
+    def iterate(self, iterable, name="data"):
+        """Iterates over a loader with the wait for every batch in a span"""
+
+        if not self.enabled:
+            return iterable
+        return self._iterate(iterable, name)
+
+    def _iterate(self, iterable, name):
+        iterator = iter(iterable)
+        while True:
+            with self.span(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def step(self):
+        """Marks the end of a training step for the trace schedule"""
+
+        if self._trace is not None:
+            self._trace.step()
+
+    def peak_memory_mb(self):
+        if self.device.type == 'cuda':
+            return torch.cuda.max_memory_allocated(self.device) / 2 ** 20
+        import resource
+        # process high water mark, kilobytes on linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2 ** 10
+
+    def epoch_summary(self):
+        """Seconds spent in each span since the last summary and the peak memory, then resets"""
+
+        summary = dict(self.totals)
+        summary["peak_memory_mb"] = self.peak_memory_mb()
+        self.totals.clear()
+        self.calls.clear()
+        if self.device.type == 'cuda':
+            torch.cuda.reset_peak_memory_stats(self.device)
+        return summary
+
+    def close(self):
+        if self._trace is not None:
+            self._trace.stop()
+            self._trace = None
@@ -0,0 +1,50 @@
+import torch
+
+REG_MODES = ["fused", "decoupled", "double"]
+
+
+def optimizer_weight_decay(mode, weight_decay):
+    """Weight decay handed to SGD for each regularization mode.
+
+    fused: SGD adds weight_decay * p to the gradient inside its multi tensor step.
+    decoupled: SGD gets none, decoupled_decay_ shrinks the parameters instead.
+    double: what training did before, an explicit weight_decay * sum(p ** 2) term in the loss
+    (gradient 2 * weight_decay * p) on top of SGD's own weight_decay, i.e. 3 * weight_decay
+    folded into the optimizer.
+    """
+
+    assert mode in REG_MODES
+    if mode == "decoupled":
+        return 0.0
+    if mode == "double":
+        return 3 * weight_decay
+    return weight_decay
+
+
+def build_optimizer(params, args):
+    """Nesterov SGD over params with the weight decay of --reg_mode, one foreach step for all parameters"""
+
+    return torch.optim.SGD(params,
+                           args.lr,
+                           momentum=args.momentum,
+                           weight_decay=optimizer_weight_decay(args.reg_mode, args.weight_decay),
+                           nesterov=True,
+                           foreach=True)
+
+
+@torch.no_grad()
+def decoupled_decay_(optimizer, weight_decay):
+    """Shrinks every parameter by (1 - lr * weight_decay), one multi tensor op per param group.
+
+    Call right before optimizer.step().
+    """
+
+    for group in optimizer.param_groups:
+        torch._foreach_mul_(group['params'], 1 - group['lr'] * weight_decay)
+
+
+@torch.no_grad()
+def l2_penalty(params):
+    """sum(p ** 2) over all parameters without building an autograd graph"""
+
+    return torch.stack(torch._foreach_norm(list(params))).pow(2).sum()
@@ -0,0 +1,168 @@
+import os
+
+import numpy as np
+import torch
+
+from background import BackgroundWriter
+
+
+class ScoreStore:
+    """Dense per sample score table indexed by the dataset ``idx`` the loaders emit.
+
+    Scores live in one preallocated ``num_train`` length tensor on the training device, so
+    every update of a batch is a constant number of kernel launches. With ``history > 0`` the
+    scores at the end of the last ``history`` epochs are kept in a float16 ring buffer.
+    """
+
+    def __init__(self, num_train, device='cpu', history=0):
+        self.scores = torch.zeros(num_train, device=device)
+        self.seen = torch.zeros(num_train, dtype=torch.bool, device=device)
+        self.labels = torch.full((num_train,), -1, dtype=torch.int64, device=device)
+        # similarity counts of the last refresh, reused between refreshes (--update_gap)
+        self.counts = torch.zeros(num_train, device=device)
+        # idx arrives on the host, keeping this mask there makes the cache check sync free
+        self.cached = torch.zeros(num_train, dtype=torch.bool)
+        # samples this process updated since the last distributed.merge_scores
+        self.touched = torch.zeros(num_train, dtype=torch.bool, device=device)
+        self.history = torch.zeros(history, num_train, dtype=torch.float16, device=device) if history else None
+        self.num_snapshots = 0
+
+    def __len__(self):
+        return self.scores.size(0)
+
+    def gather(self, idx):
+        """Scores of a batch of dataset indices"""
+
+        return self.scores.index_select(0, idx.view(-1).to(self.scores.device))
+
+    def update(self, idx, counts, epoch):
+        """Cumulative score update, returns the updated scores of the batch.
+
+        A sample seen for the first time takes its count, afterwards its score becomes
+        (score + count) / (epoch + 1).
+        """
+
+        idx = idx.view(-1).to(self.scores.device)
+        previous = self.scores.index_select(0, idx)
+        counts = counts.to(previous.dtype)
+        updated = torch.where(self.seen.index_select(0, idx), (previous + counts) / (epoch + 1), counts)
+        self.scores.index_copy_(0, idx, updated)
+        self.seen.index_fill_(0, idx, True)
+        self.touched.index_fill_(0, idx, True)
+        return updated
+
+    def add(self, idx, values):
+        """Accumulates values into the scores of a batch, repeated indices add up"""
+
+        idx = idx.view(-1).to(self.scores.device)
+        self.scores.index_add_(0, idx, values.to(self.scores.dtype))
+        self.seen.index_fill_(0, idx, True)
+        self.touched.index_fill_(0, idx, True)
+
+    def ema(self, idx, values, momentum=0.9):
+        """Exponential moving average update, a sample seen for the first time takes its value"""
+
+        idx = idx.view(-1).to(self.scores.device)
+        previous = self.scores.index_select(0, idx)
+        values = values.to(previous.dtype)
+        updated = torch.where(self.seen.index_select(0, idx), momentum * previous + (1 - momentum) * values, values)
+        self.scores.index_copy_(0, idx, updated)
+        self.seen.index_fill_(0, idx, True)
+        self.touched.index_fill_(0, idx, True)
+        return updated
+
+    def cache_counts(self, idx, counts):
+        """Keeps the similarity counts of a batch for the steps until the next refresh"""
+
+        self.counts.index_copy_(0, idx.view(-1).to(self.counts.device), counts.to(self.counts.dtype))
+        self.touched.index_fill_(0, idx.view(-1).to(self.touched.device), True)
+        self.cached[idx.view(-1).cpu()] = True
+
+    def cached_counts(self, idx):
+        return self.counts.index_select(0, idx.view(-1).to(self.counts.device))
+
+    def is_cached(self, idx):
+        """Whether every sample of the batch has counts from an earlier refresh"""
+
+        return bool(self.cached[idx.view(-1).cpu()].all())
+
+    def record_labels(self, idx, target):
+        """Remembers the labels of a batch so snapshots need no extra pass over the data"""
+
+        self.labels.index_copy_(0, idx.view(-1).to(self.labels.device), target.to(self.labels.device))
+
+    def snapshot(self):
+        """Stores the current scores in the next slot of the history ring"""
+
+        if self.history is None:
+            return
+        self.history[self.num_snapshots % self.history.size(0)].copy_(self.scores)
+        self.num_snapshots += 1
+
+    def numpy(self):
+        """Scores as a numpy array, sharing memory with the store when it lives on the cpu"""
+
+        return self.scores.detach().cpu().numpy()
+
+    def columns(self):
+        """Copy of the scores of all seen samples as compact index/score/label columns"""
+
+        seen = self.seen.cpu()
+        index = torch.nonzero(seen).view(-1)
+        return {"index": index.to(torch.int32).numpy(),
+                "score": self.scores.cpu()[index].numpy(),
+                "label": self.labels.cpu()[index].to(torch.int16).numpy()}
+
+    def history_numpy(self):
+        """Snapshots in the ring as a (num_snapshots, num_train) float16 array, oldest first"""
+
+        if self.history is None:
+            return None
+        size = self.history.size(0)
+        if self.num_snapshots <= size:
+            history = self.history[:self.num_snapshots]
+        else:
+            start = self.num_snapshots % size
+            history = torch.cat([self.history[start:], self.history[:start]])
+        return history.detach().to('cpu', copy=True).numpy()
+
+    def state_dict(self):
+        return {"scores": self.scores, "seen": self.seen, "labels": self.labels, "history": self.history,
+                "num_snapshots": self.num_snapshots, "counts": self.counts, "cached": self.cached}
+
+    def load_state_dict(self, state_dict):
+        self.scores.copy_(state_dict["scores"])
+        self.seen.copy_(state_dict["seen"])
+        self.labels.copy_(state_dict["labels"])
+        if self.history is not None and state_dict["history"] is not None:
+            self.history.copy_(state_dict["history"])
+        self.num_snapshots = state_dict["num_snapshots"]
+        self.counts.copy_(state_dict["counts"])
+        self.cached.copy_(state_dict["cached"])
+
+
+class ScoreWriter(BackgroundWriter):
+    """Saves score snapshots to ``scores_dir`` from a background thread.
+
+    Files are written to a temporary name and renamed, so a reader never sees a partial
+    snapshot. Writes are serialized in submission order.
+    """
+
+    def __init__(self, scores_dir):
+        super().__init__()
+        self.scores_dir = scores_dir
+
+    def write(self, data, file_name='score.npz'):
+        """Queues ``data`` (a dict of columns or a single array) to be saved as ``file_name``"""
+
+        self.submit(ScoreWriter._save, os.path.join(self.scores_dir, file_name), data)
+
+    @staticmethod
+    def _save(path, data):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            if isinstance(data, dict):
+                np.savez(f, **data)
+            else:
+                np.save(f, data)
+        os.replace(tmp_path, path)
@@ -0,0 +1,95 @@
+import torch
+import torch.nn.functional as F
+
+GRAM_BACKENDS = ["dense", "kron"]
+
+
+def dense_gram_rows(grads, norm=True):
+    """Returns rows(start, end), the row block [start, end) of the Gram of the per sample gradients"""
+
+    if norm:
+        grads = F.normalize(grads, p=2.0)
+    grads_t = torch.transpose(grads, 0, 1)
+    return lambda start, end: torch.matmul(grads[start:end], grads_t)
+
+
+def kron_gram_rows(features, error, head="bias", norm=True, eps=1e-12):
+    """Returns rows(start, end) of the Gram of the linear head gradients built from their two factors.
+
+    With g_i = [vec(e_i f_i^T), e_i] the inner products factor as
+    <g_i, g_j> = (e_i . e_j) * (f_i . f_j + 1), so the B by d gradient matrix is never
+    materialized and memory does not grow with the number of classes.
+    """
+
+    error_t = torch.transpose(error, 0, 1)
+    features_t = torch.transpose(features, 0, 1)
+    sq_norms = error.pow(2).sum(1)
+    if head == "linear":
+        sq_norms = sq_norms * (features.pow(2).sum(1) + 1)
+    # matches F.normalize, which divides by max(||g_i||, eps)
+    inv_norms = 1.0 / sq_norms.sqrt().clamp_min(eps)
+
+    def rows(start, end):
+        # in place, so a linear head block holds at most two row blocks at once
+        block = torch.matmul(error[start:end], error_t)
+        if head == "linear":
+            block.mul_(torch.matmul(features[start:end], features_t).add_(1))
+        if norm:
+            block.mul_(inv_norms[start:end].unsqueeze(1)).mul_(inv_norms.unsqueeze(0))
+        return block
+    return rows
+
+
+def dense_gram(grads, norm=True):
+    """Gram matrix of the (optionally l2 normalized) per sample gradients"""
+
+    return dense_gram_rows(grads, norm)(0, grads.size(0))
+
+
+def kron_gram(features, error, head="bias", norm=True, eps=1e-12):
+    """Gram matrix of the linear head gradients, see kron_gram_rows"""
+
+    return kron_gram_rows(features, error, head, norm, eps)(0, error.size(0))
+
+
+def row_buffers(backend="dense", head="bias"):
+    """Row blocks the rows() of a Gram backend holds at its peak, the factored linear head needs two"""
+
+    return 2 if backend == "kron" and head == "linear" else 1
+
+
+def threshold_counts(gram, gamma, off_diag=0.0, start=0):
+    """Number of samples in the batch whose similarity with each row is at least gamma.
+
+    The diagonal is compared after subtracting ``off_diag``; ``gram`` may be the row block
+    starting at row ``start`` of the full Gram.
+    """
+
+    counts = (gram >= gamma).sum(1)
+    if off_diag:
+        diag = gram.diagonal(offset=start)
+        counts += (diag - off_diag >= gamma).to(counts.dtype) - (diag >= gamma).to(counts.dtype)
+    return counts
+
+
+def tiled_threshold_counts(gram_rows, size, gamma, off_diag=0.0, memory_mb=0, start=0, stop=None, width=None,
+                           buffers=1):
+    """threshold_counts of rows [start, stop) of a size by size Gram streamed in row blocks from ``gram_rows``.
+
+    Blocks are sized so the ``buffers`` float32 blocks ``gram_rows`` holds at its peak (see
+    ``row_buffers``) and the threshold mask take about ``memory_mb``, the full Gram is never
+    held. ``memory_mb=0`` computes it as a single block. By default every row is counted; a
+    distributed rank counts only the rows of its own samples. ``width`` is the number of
+    columns of a row when it is not ``size``, e.g. with a gradient bank.
+    """
+
+    stop = size if stop is None else stop
+    if not memory_mb:
+        return threshold_counts(gram_rows(start, stop), gamma, off_diag, start)
+
+    width = size if width is None else width
+    block_rows = max(1, int(memory_mb * 2 ** 20 // (width * (4 * buffers + 1))))
+    counts = []
+    for begin in range(start, stop, block_rows):
+        counts.append(threshold_counts(gram_rows(begin, min(begin + block_rows, stop)), gamma, off_diag, begin))
+    return torch.cat(counts)
@@ -0,0 +1,70 @@
+import math
+
+import torch
+
+SKETCH_METHODS = ["none", "gaussian", "sparse", "srht"]
+
+
+def _fwht(x):
+    """Orthonormal fast Walsh-Hadamard transform along the last dimension (a power of two)"""
+
+    batch, n = x.shape
+    h = 1
+    while h < n:
+        x = x.view(batch, n // (2 * h), 2, h)
+        x = torch.stack((x[:, :, 0] + x[:, :, 1], x[:, :, 0] - x[:, :, 1]), dim=2)
+        h *= 2
+    return x.view(batch, n) / math.sqrt(n)
+
+
+class GradientSketch:
+    """Seeded Johnson-Lindenstrauss projection of per sample gradients from d to k dimensions.
+
+    gaussian: dense N(0, 1/k) matrix. sparse: Achlioptas matrix, entries sqrt(3/k) * {+1, 0, -1}
+    with probabilities {1/6, 2/3, 1/6}. srht: random signs, fast Walsh-Hadamard transform of the
+    zero padded gradient and k sampled coordinates, O(d log d) per sample with O(d) state.
+    The random state is drawn once and cached, or with ``resample`` redrawn every step from
+    ``seed + step``.
+    """
+
+    def __init__(self, method="gaussian", dim=128, seed=0, resample=False):
+        assert method in SKETCH_METHODS[1:]
+        self.method = method
+        self.dim = dim
+        self.seed = seed
+        self.resample = resample
+        self._cache = {}
+
+    def _draw(self, dim_in, device, dtype, seed):
+        generator = torch.Generator()
+        generator.manual_seed(seed)
+        if self.method == "gaussian":
+            state = torch.randn(dim_in, self.dim, generator=generator) / math.sqrt(self.dim)
+        elif self.method == "sparse":
+            draws = torch.randint(6, (dim_in, self.dim), generator=generator)
+            state = ((draws == 0).float() - (draws == 1).float()) * math.sqrt(3.0 / self.dim)
+        else:
+            padded = 1 << max(dim_in - 1, 0).bit_length()
+            signs = torch.randint(2, (dim_in,), generator=generator).float() * 2 - 1
+            rows = torch.randperm(padded, generator=generator)[:self.dim]
+            return signs.to(device=device, dtype=dtype), rows.to(device), math.sqrt(padded / self.dim), padded
+        return state.to(device=device, dtype=dtype)
+
+    def state(self, dim_in, device, dtype, step=0):
+        if self.resample:
+            return self._draw(dim_in, device, dtype, self.seed + step)
+        key = (dim_in, device, dtype)
+        if key not in self._cache:
+            self._cache[key] = self._draw(dim_in, device, dtype, self.seed)
+        return self._cache[key]
+
+    def __call__(self, grads, step=0):
+        """Projects a B by d gradient matrix to B by k"""
+
+        state = self.state(grads.size(1), grads.device, grads.dtype, step)
+        if self.method != "srht":
+            return torch.matmul(grads, state)
+
+        signs, rows, scale, padded = state
+        x = torch.nn.functional.pad(grads * signs, (0, padded - grads.size(1)))
+        return _fwht(x).index_select(1, rows) * scale
@@ -0,0 +1,33 @@
+import os
+from argparse import Namespace
+
+import torch
+
+from checkpoint import CheckpointWriter, checkpoints, config_mismatch, load_latest, resume_config, rng_state
+from model import resnet32
+
+
+def test_writer_keeps_newest_checkpoints(tmp_path):
+    model = resnet32(num_classes=10)
+    writer = CheckpointWriter(str(tmp_path), keep=2)
+    for epoch in range(4):
+        writer.save({"epoch": epoch, "state_dict": model.state_dict(), "rng": rng_state()}, epoch)
+    writer.close()
+
+    assert [os.path.basename(path) for path in checkpoints(str(tmp_path))] == ["checkpoint_00002.th",
+                                                                              "checkpoint_00003.th"]
+    state = load_latest(str(tmp_path))
+    assert state["epoch"] == 3
+    assert all(torch.equal(value, state["state_dict"][key]) for key, value in model.state_dict().items())
+
+
+def test_load_latest_without_checkpoints(tmp_path):
+    assert load_latest(str(tmp_path)) is None
+
+
+def test_config_mismatch_ignores_logging_flags():
+    keys = ["gamma", "grad_engine", "log_interval"]
+    saved = resume_config(Namespace(gamma=0.7, grad_engine="loop", log_interval=0), keys)
+    assert config_mismatch(saved, resume_config(Namespace(gamma=0.7, grad_engine="loop", log_interval=50), keys)) == []
+    assert config_mismatch(saved, resume_config(Namespace(gamma=0.7, grad_engine="functorch", log_interval=0),
+                                                keys)) == ["grad_engine"]
@@ -0,0 +1,61 @@
+import os
+import socket
+from argparse import Namespace
+
+import torch
+import torch.multiprocessing as mp
+
+import distributed
+from scores import ScoreStore
+from weighting import batch_weights
+
+WORLD_SIZE, BATCH_SIZE, NUM_TRAIN = 2, 16, 64
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _weight_args(batch_size, wo):
+    return Namespace(gamma=0.7, temp=1, temp_decay=0, wo=wo, cumulative=1, measure=0, batch_size=batch_size)
+
+
+def _worker(rank, port, wo):
+    # gloo on cpu, whatever GPUs the machine has
+    os.environ.update(CUDA_VISIBLE_DEVICES="", MASTER_ADDR="127.0.0.1", MASTER_PORT=str(port),
+                      WORLD_SIZE=str(WORLD_SIZE), RANK=str(rank), LOCAL_RANK=str(rank))
+    args = _weight_args(BATCH_SIZE, wo)
+    args.dist_backend, args.device = "gloo", torch.device("cpu")
+    distributed.init(args)
+    try:
+        reference_args = _weight_args(BATCH_SIZE * WORLD_SIZE, wo)
+        store, reference_store = ScoreStore(NUM_TRAIN), ScoreStore(NUM_TRAIN)
+        generator = torch.Generator()
+        generator.manual_seed(0)
+        for epoch in range(3):
+            # the same global batch on every rank, each rank owns its shard of it
+            idx = torch.randperm(NUM_TRAIN, generator=generator)[:BATCH_SIZE * WORLD_SIZE].view(-1, 1)
+            counts = torch.randint(1, BATCH_SIZE * WORLD_SIZE, (BATCH_SIZE * WORLD_SIZE,), generator=generator)
+            shard = slice(rank * BATCH_SIZE, (rank + 1) * BATCH_SIZE)
+
+            weights = batch_weights(counts[shard], idx[shard], epoch, args, store, gather=distributed.all_gather)
+            expected = batch_weights(counts, idx, epoch, reference_args, reference_store)
+            assert torch.allclose(weights, expected, atol=1e-6, rtol=1e-5)
+            assert torch.allclose(distributed.local_rows(weights, BATCH_SIZE, args), expected[shard],
+                                  atol=1e-6, rtol=1e-5)
+
+            distributed.merge_scores(store)
+            replicas = distributed.all_gather(store.scores.unsqueeze(0))
+            assert torch.equal(replicas[0], replicas[1])
+            assert torch.allclose(store.scores, reference_store.scores)
+            assert torch.equal(store.seen, reference_store.seen)
+    finally:
+        distributed.cleanup()
+
+
+def test_gathered_weights_match_single_process_global_batch():
+    for wo in (0, 1):
+        # a failed assertion in a worker is raised here
+        mp.spawn(_worker, args=(_free_port(), wo), nprocs=WORLD_SIZE)
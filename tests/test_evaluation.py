@@ -0,0 +1,59 @@
+from argparse import Namespace
+
+import pytest
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader, TensorDataset
+
+from evaluation import class_results, collect_logits, evaluate, sweep_adjustments
+from model import resnet32
+
+
+@pytest.fixture
+def setup():
+    torch.manual_seed(0)
+    num_class, num_test = 10, 200
+    args = Namespace(device=torch.device('cpu'), class_names=list(map(str, range(num_class))), logit_adj_post=1,
+                     logit_adj_train=0, logit_adjustments=torch.randn(num_class))
+    dataset = TensorDataset(torch.randn(num_test, 3, 32, 32), torch.arange(num_test) % num_class,
+                            torch.arange(num_test).view(-1, 1))
+    return args, resnet32(num_classes=num_class), DataLoader(dataset, batch_size=64)
+
+
+def test_single_pass_matches_per_sample_loop(setup):
+    args, model, loader = setup
+    criterion = nn.CrossEntropyLoss(reduction='none')
+    loss, acc, confusion = evaluate(loader, model, criterion, args)
+    results = class_results(confusion, args.class_names, acc)
+
+    # the two passes evaluate replaces: batch losses, then a per element class accuracy loop
+    num_class = len(args.class_names)
+    correct, seen, losses = [0] * num_class, [0] * num_class, 0.0
+    model.eval()
+    with torch.no_grad():
+        for inputs, labels, idx in loader:
+            output = model(inputs)
+            losses += criterion(output, labels).sum().item()
+            _, predicted = torch.max(output - args.logit_adjustments, 1)
+            for i in range(labels.size(0)):
+                correct[labels[i]] += int(labels[i] == predicted[i])
+                seen[labels[i]] += 1
+
+    assert all(abs(results["class/" + str(i)] - 100.0 * correct[i] / seen[i]) < 1e-9 for i in range(num_class))
+    assert abs(acc - 100.0 * sum(correct) / sum(seen)) < 1e-9
+    assert abs(loss - losses / sum(seen)) < 1e-4
+
+
+def test_sweep_matches_evaluate_per_tau(setup):
+    args, model, loader = setup
+    criterion = nn.CrossEntropyLoss(reduction='none')
+    prior = torch.rand(len(args.class_names), dtype=torch.float64) + 0.01
+    prior = prior / prior.sum()
+    taus = torch.linspace(0, 2, 21, dtype=torch.float64)
+    logits, labels = collect_logits(loader, model, args)
+    accs, confusions = sweep_adjustments(logits, labels, torch.log(prior.unsqueeze(0) ** taus.unsqueeze(1) + 1e-12))
+    for i in (0, 10, 20):
+        args.logit_adjustments = torch.log(prior ** taus[i] + 1e-12)
+        _, acc, confusion = evaluate(loader, model, criterion, args)
+        assert torch.equal(confusion, confusions[i])
+        assert abs(acc - accs[i].item()) < 1e-9
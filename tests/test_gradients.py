@@ -0,0 +1,23 @@
+import pytest
+import torch
+import torch.nn as nn
+
+from gradients import GRAD_HEADS, compute_per_sample_gradients
+from model import resnet32
+
+
+@pytest.mark.parametrize("num_classes", [10, 100])
+@pytest.mark.parametrize("head", GRAD_HEADS)
+def test_engines_match_loop(num_classes, head):
+    torch.manual_seed(0)
+    model = resnet32(num_classes=num_classes)
+    criterion = nn.CrossEntropyLoss(reduction='none')
+    data = torch.randn(16, 3, 32, 32)
+    targets = torch.randint(num_classes, (16,))
+
+    loop_grads = compute_per_sample_gradients(model, data, targets, criterion, "loop", head)
+    closed_form_grads = compute_per_sample_gradients(model, data, targets, criterion, "closed_form", head)
+    functorch_grads = compute_per_sample_gradients(model, data, targets, criterion, "functorch", head)
+    assert loop_grads.shape == closed_form_grads.shape == functorch_grads.shape
+    assert torch.allclose(loop_grads, closed_form_grads, atol=1e-6, rtol=1e-4)
+    assert torch.allclose(loop_grads, functorch_grads, atol=1e-5, rtol=1e-4)
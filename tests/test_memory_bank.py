@@ -0,0 +1,50 @@
+import torch
+
+from memory_bank import GradientBank
+
+
+def _grads(batch_size, value):
+    return torch.full((batch_size, 4), float(value))
+
+
+def test_empty_slots_are_masked():
+    bank = GradientBank(6)
+    rows, num_keys = bank.gram_rows(_grads(3, 1), step=0)
+    block = rows(0, 3)
+    assert block.shape == (3, 3 + 6)
+    assert torch.equal(block[:, :3], torch.full((3, 3), 4.0))
+    assert torch.isinf(block[:, 3:]).all() and (block[:, 3:] < 0).all()
+    assert int(num_keys) == 3
+
+
+def test_enqueued_slots_count_as_keys():
+    bank = GradientBank(6)
+    bank.gram_rows(_grads(2, 1), step=0)
+    bank.enqueue(_grads(2, 1), step=0)
+    rows, num_keys = bank.gram_rows(_grads(2, 2), step=1)
+    block = rows(0, 2)
+    assert torch.equal(block[:, 2:4], torch.full((2, 2), 8.0))
+    assert torch.isinf(block[:, 4:]).all()
+    assert int(num_keys) == 2 + 2
+
+
+def test_stale_slots_are_masked():
+    bank = GradientBank(4, max_age=2)
+    bank.gram_rows(_grads(2, 1), step=0)
+    bank.enqueue(_grads(2, 1), step=0)
+    assert int(bank.gram_rows(_grads(2, 1), step=2)[1]) == 4
+    rows, num_keys = bank.gram_rows(_grads(2, 1), step=3)
+    assert int(num_keys) == 2
+    assert torch.isinf(rows(0, 2)[:, 2:]).all()
+
+
+def test_enqueue_wraps_around():
+    bank = GradientBank(5)
+    bank.gram_rows(_grads(3, 1), step=0)
+    bank.enqueue(torch.arange(3, dtype=torch.float32).view(-1, 1).expand(3, 4), step=0)
+    bank.enqueue(torch.arange(3, 6, dtype=torch.float32).view(-1, 1).expand(3, 4), step=1)
+    # slots 3, 4 and then 0 take the second batch, the oldest entry of the first batch is overwritten
+    assert bank.keys[:, 0].tolist() == [5, 1, 2, 3, 4]
+    assert bank.steps.tolist() == [1, 0, 0, 1, 1]
+    assert bank.position == 1
+    assert int(bank.gram_rows(_grads(3, 1), step=2)[1]) == 3 + 5
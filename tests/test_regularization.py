@@ -0,0 +1,48 @@
+from argparse import Namespace
+
+import torch
+import torch.nn as nn
+
+from model import resnet32
+from regularization import build_optimizer, l2_penalty
+
+
+def _train(args, explicit_penalty, steps=3):
+    torch.manual_seed(0)
+    model = resnet32(num_classes=10)
+    if explicit_penalty:
+        # the step train_v2 used to take
+        optimizer = torch.optim.SGD(model.parameters(), args.lr, momentum=args.momentum,
+                                    weight_decay=args.weight_decay, nesterov=True)
+    else:
+        optimizer = build_optimizer(model.parameters(), args)
+    criterion = nn.CrossEntropyLoss()
+    generator = torch.Generator()
+    generator.manual_seed(0)
+    for _ in range(steps):
+        inputs = torch.randn(16, 3, 32, 32, generator=generator)
+        targets = torch.randint(10, (16,), generator=generator)
+        loss = criterion(model(inputs), targets)
+        if explicit_penalty:
+            loss_r = 0
+            for parameter in model.parameters():
+                loss_r += torch.sum(parameter ** 2)
+            loss = loss + args.weight_decay * loss_r
+        optimizer.zero_grad()
+        loss.backward()
+        optimizer.step()
+    return model
+
+
+def test_double_mode_matches_explicit_l2_term():
+    args = Namespace(lr=0.1, momentum=0.9, weight_decay=1e-4, reg_mode="double")
+    reference = _train(args, explicit_penalty=True)
+    model = _train(args, explicit_penalty=False)
+    for param, expected in zip(model.parameters(), reference.parameters()):
+        assert torch.allclose(param, expected, atol=1e-4)
+
+
+def test_l2_penalty_is_sum_of_squares():
+    torch.manual_seed(0)
+    params = list(resnet32(num_classes=10).parameters())
+    assert torch.allclose(l2_penalty(params), sum(torch.sum(p ** 2) for p in params), rtol=1e-4)
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from dataset.sampler import ScoreSampler, SumTree
+
+
+def test_sum_tree_draws_proportional_to_weights():
+    counts = np.array([1.0, 2.0, 4.0])
+    tree = SumTree(1.0 / counts)
+    rng = np.random.default_rng(0)
+    draws = np.bincount([tree.draw(rng) for _ in range(20000)], minlength=3) / 20000
+    assert draws == pytest.approx([4 / 7, 2 / 7, 1 / 7], abs=0.02)
+
+
+def test_select_draws_without_replacement():
+    sampler = ScoreSampler(100, keep_ratio=0.9, head_only=False)
+    counts = np.random.default_rng(0).integers(1, 50, 100).astype(np.float64)
+    selected = sampler._select(counts, np.zeros(100, dtype=np.int64)).numpy()
+    assert len(selected) == 90
+    assert len(np.unique(selected)) == 90
+
+
+def test_select_favours_low_counts():
+    counts = np.array([1.0] * 50 + [10.0] * 50)
+    kept_low = []
+    for seed in range(20):
+        sampler = ScoreSampler(100, keep_ratio=0.2, head_only=False, seed=seed)
+        selected = sampler._select(counts, np.zeros(100, dtype=np.int64)).numpy()
+        kept_low.append((selected < 50).mean())
+    # a sample with count 1 is ten times as likely to be drawn as one with count 10
+    assert np.mean(kept_low) > 0.8
+
+
+def test_head_only_keeps_tail_within_budget():
+    labels = np.array([0] * 80 + [1] * 15 + [2] * 5)
+    sampler = ScoreSampler(100, keep_ratio=0.5, head_only=True)
+    selected = sampler._select(np.ones(100), labels).numpy()
+    assert len(selected) == 50
+    assert len(np.unique(selected)) == 50
+    # classes 1 and 2 are smaller than the average class and kept whole
+    assert set(range(80, 100)) <= set(selected.tolist())
@@ -0,0 +1,57 @@
+import pytest
+import torch
+
+from gradients import GRAD_HEADS, closed_form_per_sample_gradients, head_error
+from similarity import dense_gram, dense_gram_rows, kron_gram, kron_gram_rows, tiled_threshold_counts
+
+
+def _head_batch(batch_size, num_classes, feature_dim=64):
+    torch.manual_seed(0)
+    features = torch.randn(batch_size, feature_dim).relu()
+    logits = torch.randn(batch_size, num_classes)
+    targets = torch.randint(num_classes, (batch_size,))
+    return features, logits, targets
+
+
+@pytest.mark.parametrize("num_classes", [10, 100])
+@pytest.mark.parametrize("head", GRAD_HEADS)
+@pytest.mark.parametrize("norm", [True, False])
+def test_kron_gram_matches_dense(num_classes, head, norm):
+    features, logits, targets = _head_batch(128, num_classes)
+    grads = closed_form_per_sample_gradients(features, logits, targets, head)
+    factored = kron_gram(features, head_error(logits, targets), head, norm)
+    assert torch.allclose(dense_gram(grads, norm), factored, atol=1e-5, rtol=1e-4)
+
+
+@pytest.mark.parametrize("off_diag", [0.0, 0.5])
+def test_untiled_counts_match_full_gram(off_diag):
+    features, logits, targets = _head_batch(128, 10)
+    grads = closed_form_per_sample_gradients(features, logits, targets, "linear")
+    expected = (dense_gram(grads) - off_diag * torch.eye(128) >= 0.7).sum(1)
+    assert torch.equal(expected, tiled_threshold_counts(dense_gram_rows(grads), 128, 0.7, off_diag))
+
+
+def test_tiled_kron_counts_match_single_block():
+    features, logits, targets = _head_batch(128, 10)
+    rows = kron_gram_rows(features, head_error(logits, targets), "linear")
+    expected = tiled_threshold_counts(rows, 128, 0.7)
+    tiled = tiled_threshold_counts(rows, 128, 0.7, 0.0, 0.01, buffers=2)
+    # row blocks may round differently from the single block right at gamma
+    assert (expected != tiled).sum() <= 2
+
+
+def test_tiles_are_sized_by_row_width():
+    # integer similarities are exact, so splitting the rows cannot flip a count at gamma
+    grads = torch.randint(-2, 3, (64, 8)).float()
+    keys_t = torch.cat([grads, torch.randint(-2, 3, (192, 8)).float()]).T
+    block_sizes = []
+
+    def rows(start, end):
+        block_sizes.append(end - start)
+        return torch.matmul(grads[start:end], keys_t)
+
+    expected = (torch.matmul(grads, keys_t) >= 2).sum(1)
+    # room for 16 rows of 256 columns and their mask
+    memory_mb = 16 * 256 * 5 / 2 ** 20
+    assert torch.equal(expected, tiled_threshold_counts(rows, 64, 2, 0.0, memory_mb, width=256))
+    assert max(block_sizes) == 16
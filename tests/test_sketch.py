@@ -0,0 +1,21 @@
+import pytest
+import torch
+
+from similarity import dense_gram
+from sketch import SKETCH_METHODS, GradientSketch
+
+
+@pytest.mark.parametrize("method", SKETCH_METHODS[1:])
+def test_sketch_preserves_cosine_similarities(method):
+    torch.manual_seed(0)
+    grads = torch.randn(10, 2000)[torch.randint(10, (64,))] + 0.5 * torch.randn(64, 2000)
+    error = (dense_gram(GradientSketch(method, 512)(grads)) - dense_gram(grads)).abs()
+    assert error.mean() < 0.06
+
+
+@pytest.mark.parametrize("method", SKETCH_METHODS[1:])
+def test_sketch_is_seeded(method):
+    grads = torch.randn(8, 300)
+    assert torch.equal(GradientSketch(method, 32, seed=1)(grads), GradientSketch(method, 32, seed=1)(grads))
+    resampled = GradientSketch(method, 32, seed=1, resample=True)
+    assert not torch.equal(resampled(grads, step=0), resampled(grads, step=1))
@@ -0,0 +1,27 @@
+from argparse import Namespace
+
+import pytest
+import torch
+import torch.nn.functional as F
+
+from scores import ScoreStore
+from similarity import threshold_counts
+from weighting import batch_weights, loop_batch_weights
+
+
+@pytest.mark.parametrize("wo", [0, 1])
+@pytest.mark.parametrize("cumulative", [0, 1])
+def test_batch_weights_match_loop(wo, cumulative):
+    torch.manual_seed(0)
+    num_train, batch_size = 1000, 64
+    args = Namespace(gamma=0.7, off_diag=0, temp=1, temp_decay=0, wo=wo, cumulative=cumulative, measure=0,
+                     batch_size=batch_size)
+    score = {}
+    store = ScoreStore(num_train)
+    for epoch in range(3):
+        for idx in torch.randperm(num_train)[:4 * batch_size].view(-1, batch_size, 1):
+            grads = F.normalize(torch.randn(batch_size, 10), p=2.0)
+            gram = torch.matmul(grads, torch.transpose(grads, 0, 1))
+            expected = loop_batch_weights(gram, idx, epoch, args, score)
+            weights = batch_weights(threshold_counts(gram, args.gamma), idx, epoch, args, store)
+            assert torch.allclose(expected.float(), weights, atol=1e-6, rtol=1e-5)
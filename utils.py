@@ -1,11 +1,7 @@
 import os
 import torch
-import numpy as np
 from torch.utils.data import DataLoader
-from torchvision.datasets import ImageFolder 
-
-from dataset.utils import DATASET_MAPPINGS
-from dataset.transforms import TRAIN_TRANSFORMS, TEST_TRANSFORMS
+from torch.utils.data.distributed import DistributedSampler
 
 
 class AverageMeter:
@@ -41,42 +37,6 @@ def accuracy(outputs, labels):
     return acc
 
 
-def class_accuracy(test_loader, model, args):
-    """ Computes the accuracy for each class"""
-
-    classes = args.class_names
-    num_class = len(args.class_names)
-    with torch.no_grad():
-        n_class_correct = [0 for _ in range(num_class)]
-        n_class_samples = [0 for _ in range(num_class)]
-        for images, labels, idx in test_loader:
-            images = images.to(args.device)
-            labels = labels.to(args.device)
-
-            output = model(images)
-
-            if args.logit_adj_post:
-                output = output - args.logit_adjustments
-
-            _, predicted = torch.max(output, 1)
-
-            for i in range(labels.size(0)):
-                label = labels[i]
-                pred = predicted[i]
-                if label == pred:
-                    n_class_correct[label] += 1
-                n_class_samples[label] += 1
-
-        results = {}
-        avg_acc = 0
-        for i in range(num_class):
-            acc = 100.0 * n_class_correct[i] / n_class_samples[i]
-            avg_acc += acc
-            results["class/" + classes[i]] = acc
-        results["AA"] = avg_acc / num_class
-        return results
-
-
 def make_dir(log_dir):
     """ Makes a directory """
 
@@ -146,27 +106,35 @@ def score_folders(args):
     make_dir(exp_loc)
     return exp_loc 
 
+def label_counts(train_loader, args):
+    """Number of training samples of each class, from the dataset's label index"""
+
+    return torch.from_numpy(train_loader.dataset.get_class_counts()).to(args.device)
+
+
+def adjustment_from_counts(counts, tro, device):
+    """log(prior ** tro) of the class counts; tro may be a 1d tensor of taus, giving one row per tau"""
+
+    prior = counts.to(device=device, dtype=torch.float64)
+    prior = prior / prior.sum()
+    if torch.is_tensor(tro) and tro.dim():
+        return torch.log(prior.unsqueeze(0) ** tro.to(prior).unsqueeze(1) + 1e-12)
+    return torch.log(prior ** tro + 1e-12)
+
+
 def compute_adjustment(train_loader, tro, args):
     """compute the base probabilities"""
 
-    label_freq = {}
-    for i, (inputs, target,idx) in enumerate(train_loader):
-        target = target.to(args.device)
-        for j in target:
-            key = int(j.item())
-            label_freq[key] = label_freq.get(key, 0) + 1
-    label_freq = dict(sorted(label_freq.items()))
-    label_freq_array = np.array(list(label_freq.values()))
-    label_freq_array = label_freq_array / label_freq_array.sum()
-    adjustments = np.log(label_freq_array ** tro + 1e-12)
-    adjustments = torch.from_numpy(adjustments)
-    adjustments = adjustments.to(args.device)
-    return adjustments
+    return adjustment_from_counts(label_counts(train_loader, args), tro, args.device)
 
 
 def get_loaders(args):
     """loads the dataset"""
 
+    # torchvision is only imported once data is actually loaded
+    from dataset.utils import DATASET_MAPPINGS
+    from dataset.transforms import TRAIN_TRANSFORMS, TEST_TRANSFORMS
+
     dataset = DATASET_MAPPINGS[args.dataset]
     train_dataset = dataset(root=args.data_home,
                             train=True,
@@ -202,10 +170,27 @@ def get_loaders_v2(args):
 
     """loads the dataset"""
 
-    dataset = DATASET_MAPPINGS[args.dataset]
+    # torchvision is only imported once data is actually loaded
+    from dataset.utils import DATASET_MAPPINGS, MMAP_DATASET_MAPPINGS
+    from dataset.loader import DeviceLoader
+    from dataset.sampler import ScoreSampler
+    from dataset.transforms import TRAIN_TRANSFORMS, TEST_TRANSFORMS, PRE_BATCH_TRANSFORMS, BATCH_TRANSFORMS
+
+    if args.data_format == 'mmap':
+        dataset = MMAP_DATASET_MAPPINGS[args.dataset]
+    else:
+        dataset = DATASET_MAPPINGS[args.dataset]
+    if args.batch_augment:
+        # workers only decode, augmentation runs batched in train_v2
+        train_transform = PRE_BATCH_TRANSFORMS[args.dataset]
+        # one augmentation stream per rank, the shards of the global batch get different flips and crops
+        args.train_augment = BATCH_TRANSFORMS[args.dataset](args.augment_seed + args.rank)
+    else:
+        train_transform = TRAIN_TRANSFORMS[args.dataset]
+        args.train_augment = None
     train_dataset = dataset(root=args.data_home,
                             train=True,
-                            transform=TRAIN_TRANSFORMS[args.dataset],
+                            transform=train_transform,
                             download=True)
     num_train = len(train_dataset)
    
@@ -214,15 +199,36 @@ def get_loaders_v2(args):
                            train=False,
                            transform=TEST_TRANSFORMS[args.dataset])
 
-    train_loader = DataLoader(dataset=train_dataset,
-                              batch_size=args.batch_size,
-                              shuffle=True,
-                              num_workers=args.num_workers)
-
-    test_loader = DataLoader(dataset=test_dataset,
-                             batch_size=args.batch_size,
-                             shuffle=False,
-                             num_workers=args.num_workers)
+    args.train_sampler = None
+    args.dist_sampler = None
+    if args.distributed:
+        # every rank draws an equally long shard of a shared permutation, so the seed is not per rank
+        args.dist_sampler = DistributedSampler(train_dataset, shuffle=True, seed=args.augment_seed)
+    elif args.keep_ratio < 1:
+        args.train_sampler = ScoreSampler(num_train, args.keep_ratio, args.prune_warmup, args.prune_refresh,
+                                          args.prune_head_only, args.augment_seed, train_dataset.get_labels())
+
+    sampler = args.dist_sampler if args.dist_sampler is not None else args.train_sampler
+
+    if args.loader == 'device':
+        # the whole dataset sits on the device and the loader augments every batch itself
+        augment = BATCH_TRANSFORMS[args.dataset](args.augment_seed + args.rank)
+        args.train_augment = None
+        train_loader = DeviceLoader(train_dataset, args.batch_size, shuffle=True, transform=augment,
+                                    device=args.device, seed=args.augment_seed, sampler=sampler)
+        test_loader = DeviceLoader(test_dataset, args.batch_size, shuffle=False, transform=augment.normalize,
+                                   device=args.device)
+    else:
+        train_loader = DataLoader(dataset=train_dataset,
+                                  batch_size=args.batch_size,
+                                  shuffle=sampler is None,
+                                  sampler=sampler,
+                                  num_workers=args.num_workers)
+
+        test_loader = DataLoader(dataset=test_dataset,
+                                 batch_size=args.batch_size,
+                                 shuffle=False,
+                                 num_workers=args.num_workers)
 
     args.class_names = train_dataset.get_classes()
     args.epochs = train_dataset.get_epoch()
@@ -0,0 +1,86 @@
+import torch
+import torch.nn.functional as F
+
+
+
+def temperature(args, epoch):
+    """Softmax temperature of the current epoch"""
+
+    if args.temp_decay:
+        return args.temp * (epoch / 100 + 1)
+    return args.temp
+
+
+def count_weights(counts, temp, wo=0, batch_size=None):
+    """Turns similarity counts into per sample loss weights"""
+
+    weights = counts.float() / temp
+    if wo == 0:
+        weights = F.softmax(-weights, dim=0)
+    elif wo == 1:
+        weights = batch_size / weights
+    return weights
+
+
+def embedding_weights(features, gamma, temp):
+    """Loss weights from the thresholded cosine similarity of the penultimate features"""
+
+    features = F.normalize(features, p=2.0)
+    ft_gram = F.relu(torch.matmul(features, torch.transpose(features, 0, 1)) - gamma)
+    return F.softmax(-ft_gram.sum(1) / temp, dim=0)
+
+
+def batch_weights(counts, idx, epoch, args, score_store, features=None, update=True, gather=None):
+    """Per sample weights of a batch from its thresholded gradient similarity counts.
+
+    Every stage runs as a batched tensor op on the device of ``counts`` (see
+    ``similarity.threshold_counts``); the cumulative scores are read from and, with
+    ``update``, written to ``score_store`` (a ``scores.ScoreStore``).
+
+    With ``gather`` (``distributed.all_gather``) only the scores of the local samples are
+    updated and the weights are normalized over the batches of all ranks; the weights of
+    the whole global batch are returned.
+    """
+
+    temp = temperature(args, epoch)
+    batch_size = args.batch_size
+
+    if update:
+        cumulative = score_store.update(idx, counts, epoch)
+    else:
+        cumulative = score_store.gather(idx)
+    if args.cumulative:
+        counts = cumulative
+    if gather is not None:
+        counts = gather(counts)
+        batch_size = args.batch_size * args.world_size
+        if features is not None:
+            features = gather(features.detach())
+    weights = count_weights(counts, temp, args.wo, batch_size)
+
+    if args.measure == 1:
+        alpha = epoch / 1241
+        weights = (1 - alpha) * weights + alpha * embedding_weights(features.detach(), args.gamma, temp)
+    return weights.detach()
+
+
+def loop_batch_weights(gram, idx, epoch, args, score):
+    """Reference implementation batch_weights replaces: per row counts and a per index dict of scores"""
+
+    temp = temperature(args, epoch)
+    weights = [(row >= args.gamma).sum() for row in gram]
+    for i, index in enumerate(idx):
+        index = int(index)
+        if index in score:
+            score[index] = (score[index] + weights[i]) / (epoch + 1)
+        else:
+            score[index] = weights[i]
+        if args.cumulative:
+            weights[i] = score[index]
+    weights = torch.tensor([float(w) for w in weights]).to(gram.device)
+    weights = weights / temp
+    if args.wo == 0:
+        weights = F.softmax(-weights, dim=0)
+    elif args.wo == 1:
+        weights = torch.tensor([args.batch_size / number for number in weights]).to(gram.device)
+    return weights.detach()